@@ -1,6 +1,13 @@
 from .get_tasks_aggregation import GetTasksAggregation
+from .task_dashboard_aggregation import (
+    UserDashboardAggregation,
+    TeamDashboardAggregation,
+    TaskDashboardSync,
+)
 
 # Registry van alle beschikbare aggregations
 AGGREGATIONS = {
     "get_tasks": GetTasksAggregation,
+    "dashboard_user": UserDashboardAggregation,
+    "dashboard_team": TeamDashboardAggregation,
 }
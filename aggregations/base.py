@@ -9,12 +9,20 @@ class BaseAggregation(ABC):
     database: str = None
     collection: str = None
 
+    # Tolerantie voor verouderde data - override in subclass
+    # None = volg de default routing (MONGODB_READ_PREFERENCE)
+    read_preference: str = None
+    max_staleness_seconds: int = None
+
+    # Collections waarvan het resultaat afhangt (voor ETags), default [collection]
+    source_collections: List[str] = None
+
     @abstractmethod
     def build_pipeline(self, params: Dict[str, Any]) -> List[Dict]:
         """Bouw de MongoDB aggregation pipeline op basis van parameters."""
         pass
 
-    def execute(self, client, params: Dict[str, Any]) -> List[Dict]:
+    def execute(self, client, params: Dict[str, Any], read_preference=None) -> List[Dict]:
         """Voer de aggregation uit en return resultaten."""
         if not self.database or not self.collection:
             raise ValueError("database en collection moeten gedefinieerd zijn")
@@ -22,5 +30,7 @@ class BaseAggregation(ABC):
         pipeline = self.build_pipeline(params)
         db = client[self.database]
         coll = db[self.collection]
+        if read_preference is not None:
+            coll = coll.with_options(read_preference=read_preference)
 
         return list(coll.aggregate(pipeline))
@@ -1,4 +1,5 @@
 # Filter functies voor MongoDB aggregations
 from .task_filters import TaskFilters
+from .raw_task_filters import RawTaskFilters
 
-__all__ = ["TaskFilters"]
+__all__ = ["TaskFilters", "RawTaskFilters"]
@@ -0,0 +1,101 @@
+"""
+Filter functies op de ruwe Tasks velden (voor FORMAT_TASKS).
+
+Zelfde parameters als TaskFilters (labels zoals "Open" of "Klacht"), maar
+vertaald naar de ruwe waarden via de mappings uit format_tasks.py. Zo kunnen
+ze indexes gebruiken en hoeft niet elke taak eerst geformatteerd te worden.
+
+Filters op project velden (by_project_number, by_project_status) verwachten
+dat JOIN_PROJECTS al in de pipeline zit.
+"""
+from typing import Dict, List
+from ..pipelines import (
+    TASK_STATUS_LABELS,
+    TASK_TYPE_LABELS,
+    PROJECT_STATUS_LABELS,
+    UNKNOWN_LABEL,
+)
+
+
+def _match_labels(field: str, labels: List[str], label_map: Dict, default_is_raw: bool) -> dict:
+    """
+    Bouw een $match conditie die dezelfde taken selecteert als een filter op labels.
+
+    Args:
+        field: Ruw veld, bijv. "Status"
+        labels: Gevraagde labels, bijv. ["Open", "Bezig"]
+        label_map: {ruwe waarde: label} mapping
+        default_is_raw: True als de $switch default de ruwe waarde is (i.p.v. "Onbekend")
+    """
+    values = [raw for raw, label in label_map.items() if label in labels]
+    known = set(label_map.values())
+    if default_is_raw:
+        # Onbekende waarden komen ongewijzigd in de output, dus label == ruwe waarde
+        values.extend(label for label in labels if label not in known)
+    elif UNKNOWN_LABEL in labels:
+        return {"$or": [
+            {field: {"$in": values}},
+            {field: {"$nin": list(label_map.keys())}},
+        ]}
+    return {field: {"$in": values}}
+
+
+class RawTaskFilters:
+    """Statische filter methodes op ruwe task velden."""
+
+    @staticmethod
+    def by_status(status_list: List[str]) -> List[dict]:
+        """Filter taken op status label, bijv. ["Open", "Bezig"]."""
+        if not status_list:
+            return []
+        return [{"$match": _match_labels("Status", status_list, TASK_STATUS_LABELS, False)}]
+
+    @staticmethod
+    def by_type(type_list: List[str]) -> List[dict]:
+        """Filter taken op type label, bijv. ["Facturatie", "Klacht"]."""
+        if not type_list:
+            return []
+        return [{"$match": _match_labels("Type", type_list, TASK_TYPE_LABELS, True)}]
+
+    @staticmethod
+    def by_user(user_id: str) -> List[dict]:
+        """Filter taken van specifieke gebruiker."""
+        if not user_id:
+            return []
+        return [{"$match": {"UserId": user_id}}]
+
+    @staticmethod
+    def by_team(team: str) -> List[dict]:
+        """Filter taken van specifiek team."""
+        if not team:
+            return []
+        return [{"$match": {"Team": team}}]
+
+    @staticmethod
+    def by_project_number(project_number: str) -> List[dict]:
+        """Filter taken voor specifiek project (na JOIN_PROJECTS)."""
+        if not project_number:
+            return []
+        return [{"$match": {"ProjectDetails.ProjectNumber": project_number}}]
+
+    @staticmethod
+    def has_notes(min_notes: int = 1) -> List[dict]:
+        """Filter taken met minimaal X notities."""
+        return [{"$match": {f"Notes.{max(min_notes, 1) - 1}": {"$exists": True}}}]
+
+    @staticmethod
+    def has_subtasks(min_subtasks: int = 1) -> List[dict]:
+        """Filter taken met minimaal X subtaken."""
+        return [{"$match": {f"TaskList.{max(min_subtasks, 1) - 1}": {"$exists": True}}}]
+
+    @staticmethod
+    def has_incomplete_subtasks() -> List[dict]:
+        """Filter taken met onvoltooide subtaken."""
+        return [{"$match": {"TaskList": {"$elemMatch": {"Completed": {"$ne": True}}}}}]
+
+    @staticmethod
+    def by_project_status(status_list: List[str]) -> List[dict]:
+        """Filter taken waarvan het project een bepaalde status heeft (na JOIN_PROJECTS)."""
+        if not status_list:
+            return []
+        return [{"$match": _match_labels("ProjectDetails.Status", status_list, PROJECT_STATUS_LABELS, False)}]
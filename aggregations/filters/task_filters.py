@@ -145,13 +145,13 @@ class TaskFilters:
 
     @staticmethod
     def sort_by_deadline(ascending: bool = True) -> List[dict]:
-        """Sorteer op deadline."""
-        return [{"$sort": {"deadline": 1 if ascending else -1}}]
+        """Sorteer op deadline (taskId als tiebreaker, voor een vaste volgorde)."""
+        return [{"$sort": {"deadline": 1 if ascending else -1, "taskId": 1}}]
 
     @staticmethod
     def sort_by_created(ascending: bool = False) -> List[dict]:
-        """Sorteer op aanmaakdatum (nieuwste eerst by default)."""
-        return [{"$sort": {"aangemaakt": 1 if ascending else -1}}]
+        """Sorteer op aanmaakdatum (nieuwste eerst by default, taskId als tiebreaker)."""
+        return [{"$sort": {"aangemaakt": 1 if ascending else -1, "taskId": 1}}]
 
     # === LIMIT ===
 
@@ -0,0 +1,4 @@
+# Python formatters als alternatief voor server-side pipeline blokken
+from .task_formatter import RAW_TASK_PROJECTION, TickConverter, format_tasks
+
+__all__ = ["RAW_TASK_PROJECTION", "TickConverter", "format_tasks"]
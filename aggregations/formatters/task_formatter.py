@@ -0,0 +1,262 @@
+"""
+Formatter: Tasks naar leesbaar formaat, in de Function worker i.p.v. op Atlas
+
+Python versie van pipelines/format_tasks.py (FORMAT_TASKS). De output is
+identiek aan die van de $project stage: zelfde velden, volgorde en waarden,
+en velden die in MongoDB ontbreken ($$REMOVE) ontbreken hier ook.
+
+- Enum labels komen uit dict lookups die uit dezelfde $switch mappings
+  gegenereerd worden (TASK_STATUS_LABELS, ...)
+- .NET ticks worden via een TickConverter omgezet die per batch de
+  datum strings per dag cached
+
+Verwacht documenten na JOIN_PROJECTS met (minstens) de velden uit RAW_TASK_PROJECTION.
+"""
+from datetime import date
+from typing import Any, Dict, List, Optional
+from ..pipelines import (
+    TASK_STATUS_LABELS,
+    TASK_TYPE_LABELS,
+    PROJECT_STATUS_LABELS,
+    PROJECT_TYPE_LABELS,
+    UNKNOWN_LABEL,
+)
+
+TICKS_AT_EPOCH = 621355968000000000
+MS_PER_DAY = 86400000
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# Ruwe velden die format_tasks nodig heeft (projectie na JOIN_PROJECTS)
+RAW_TASK_PROJECTION = {
+    "_id": 1,
+    "Title": 1,
+    "Description": 1,
+    "Status": 1,
+    "Type": 1,
+    "DueDate": 1,
+    "UserId": 1,
+    "Team": 1,
+    "CreatedOn": 1,
+    "Notes": 1,
+    "TaskList": 1,
+    "Version": 1,
+    "ProjectDetails.Name": 1,
+    "ProjectDetails.ProjectNumber": 1,
+    "ProjectDetails.Status": 1,
+    "ProjectDetails.Type": 1,
+    "ProjectDetails.ExecutedPercentage": 1,
+    "ProjectDetails.Address": 1,
+    "ProjectDetails.CustomerReference": 1,
+    "ProjectDetails.RequestedExecutionDate": 1,
+    "ProjectDetails.Measurements": 1,
+    "ProjectDetails.OpenQuotations": 1,
+    "ProjectDetails.Stats.EstimatedTurnover": 1,
+    "ProjectDetails.Contacts": 1,
+    "ProjectDetails.WebUrl": 1,
+}
+
+_MISSING = object()
+
+
+class TickConverter:
+    """
+    Zet .NET ticks om naar datum strings zoals $dateToString na $toDate.
+
+    Volgt de server berekening: (ticks - epoch) als double gedeeld door 10000,
+    afgekapt naar milliseconden. Datum strings worden per dag gecached, zodat een
+    batch taken met veel dezelfde dagen maar een keer per dag een datum opbouwt.
+    """
+
+    def __init__(self):
+        self._days: Dict[int, str] = {}
+
+    @staticmethod
+    def _millis(ticks) -> int:
+        return int(float(ticks - TICKS_AT_EPOCH) / 10000.0)
+
+    def _day(self, day: int) -> str:
+        text = self._days.get(day)
+        if text is None:
+            d = date.fromordinal(EPOCH_ORDINAL + day)
+            text = f"{d.day:02d}-{d.month:02d}-{d.year:04d}"
+            self._days[day] = text
+        return text
+
+    def to_date(self, ticks) -> str:
+        """Formaat "%d-%m-%Y"."""
+        return self._day(self._millis(ticks) // MS_PER_DAY)
+
+    def to_datetime(self, ticks) -> str:
+        """Formaat "%d-%m-%Y %H:%M"."""
+        day, ms = divmod(self._millis(ticks), MS_PER_DAY)
+        return f"{self._day(day)} {ms // 3600000:02d}:{ms // 60000 % 60:02d}"
+
+
+def _first(value):
+    """$arrayElemAt [value, 0]: None als het veld ontbreekt, null of leeg is."""
+    if isinstance(value, list) and value:
+        return value[0]
+    return None
+
+
+def _label(value, labels: Dict, default=UNKNOWN_LABEL):
+    """$switch op $eq branches: label, of de default (UNKNOWN_LABEL of de ruwe waarde)."""
+    if value is not _MISSING and not isinstance(value, bool):
+        try:
+            label = labels.get(value)
+        except TypeError:  # niet hashbaar (array/document): nooit gelijk
+            label = None
+        if label is not None:
+            return label
+    return default
+
+
+def _to_string(value) -> str:
+    """$toString voor de waarden die in ExecutedPercentage voorkomen."""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _set(target: Dict, key: str, value) -> None:
+    """Ontbrekende waarden laat $project weg i.p.v. null te zetten."""
+    if value is not _MISSING:
+        target[key] = value
+
+
+def _sub(doc: Optional[Dict], key: str):
+    if isinstance(doc, dict):
+        return doc.get(key, _MISSING)
+    return _MISSING
+
+
+def _format_project(project, ticks: TickConverter) -> Dict[str, Any]:
+    out = {}
+    _set(out, "naam", _sub(project, "Name"))
+    _set(out, "nummer", _sub(project, "ProjectNumber"))
+    out["status"] = _label(_sub(project, "Status"), PROJECT_STATUS_LABELS)
+    project_type = _sub(project, "Type")
+    _set(out, "type", _label(project_type, PROJECT_TYPE_LABELS, project_type))
+
+    percentage = _sub(project, "ExecutedPercentage")
+    out["voortgang"] = _to_string(0 if percentage is _MISSING or percentage is None else percentage) + "%"
+
+    address = _sub(project, "Address")
+    parts = []
+    for key in ("Addressline1", "Zip", "City"):
+        value = _sub(address, key)
+        parts.append("" if value is _MISSING or value is None else value)
+    out["locatie"] = f"{parts[0]}, {parts[1]} {parts[2]}"
+
+    _set(out, "klantReferentie", _sub(project, "CustomerReference"))
+
+    requested = _first(_sub(project, "RequestedExecutionDate"))
+    out["gewensteStartdatum"] = ticks.to_date(requested) if _is_positive(requested) else None
+    return out
+
+
+def _is_positive(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and value > 0
+
+
+def _format_notes(notes, ticks: TickConverter) -> List[Dict]:
+    out = []
+    for note in notes:
+        item = {}
+        _set(item, "bericht", _sub(note, "Message"))
+        _set(item, "auteur", _sub(note, "Username"))
+        _set(item, "auteurId", _sub(note, "UserId"))
+        moment = _first(_sub(note, "Moment"))
+        item["datum"] = ticks.to_datetime(moment) if _is_positive(moment) else None
+        out.append(item)
+    return out
+
+
+def _format_subtasks(subtasks) -> List[Dict]:
+    out = []
+    for subtask in subtasks:
+        item = {}
+        _set(item, "titel", _sub(subtask, "Title"))
+        _set(item, "voltooid", _sub(subtask, "Completed"))
+        _set(item, "volgorde", _sub(subtask, "Order"))
+        out.append(item)
+    return out
+
+
+def _main_contact(project) -> Dict[str, Any]:
+    contacts = _sub(project, "Contacts")
+    klant = _MISSING
+    for contact in contacts if isinstance(contacts, list) else []:
+        tags = _sub(contact, "Tags")
+        if isinstance(tags, list) and "Klant" in tags:
+            klant = contact
+            break
+    details = _sub(klant, "Contact") if klant is not _MISSING else _MISSING
+    out = {}
+    _set(out, "naam", _sub(details, "DisplayName"))
+    _set(out, "telefoon", _sub(details, "Phone"))
+    _set(out, "email", _sub(details, "Email"))
+    return out
+
+
+def _dotnet_date(value, ticks: TickConverter):
+    first = _first(value)
+    if first is None:
+        return None
+    return ticks.to_date(first)
+
+
+def _array(value) -> list:
+    return value if isinstance(value, list) else []
+
+
+def format_task(doc: Dict[str, Any], ticks: TickConverter) -> Dict[str, Any]:
+    """Formatteer een enkele taak (zie FORMAT_TASKS voor de betekenis van de velden)."""
+    project = doc.get("ProjectDetails", _MISSING)
+    out = {}
+
+    # === TAAK DETAILS ===
+    out["taskId"] = str(doc["_id"])
+    _set(out, "titel", doc.get("Title", _MISSING))
+    _set(out, "beschrijving", doc.get("Description", _MISSING))
+    out["status"] = _label(doc.get("Status", _MISSING), TASK_STATUS_LABELS)
+    task_type = doc.get("Type", _MISSING)
+    _set(out, "type", _label(task_type, TASK_TYPE_LABELS, task_type))
+    out["deadline"] = _dotnet_date(doc.get("DueDate"), ticks)
+    _set(out, "toegewezenAan", doc.get("UserId", _MISSING))
+    _set(out, "team", doc.get("Team", _MISSING))
+    out["aangemaakt"] = _dotnet_date(doc.get("CreatedOn"), ticks)
+
+    # === PROJECT CONTEXT ===
+    out["project"] = _format_project(project, ticks)
+
+    # === NOTITIES ===
+    notes = _array(doc.get("Notes"))
+    out["notes"] = _format_notes(notes, ticks)
+    out["aantalNotes"] = len(notes)
+
+    # === SUBTAKEN (TaskList) ===
+    subtasks = _array(doc.get("TaskList"))
+    out["subtaken"] = _format_subtasks(subtasks)
+    out["aantalSubtaken"] = len(subtasks)
+    out["voltooideSubtaken"] = sum(1 for s in subtasks if _sub(s, "Completed") is True)
+
+    # === VERSIE INFO ===
+    _set(out, "versie", doc.get("Version", _MISSING))
+
+    # === EXTRA INFO ===
+    extra = {"aantalOpmetingen": len(_array(_sub(project, "Measurements")))}
+    _set(extra, "openOffertes", _sub(project, "OpenQuotations"))
+    _set(extra, "geschatteOmzet", _sub(_sub(project, "Stats"), "EstimatedTurnover"))
+    extra["hoofdcontact"] = _main_contact(project)
+    _set(extra, "sharepointLink", _sub(project, "WebUrl"))
+    out["extra"] = extra
+    return out
+
+
+def format_tasks(docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Formatteer een batch taken met een gedeelde TickConverter."""
+    ticks = TickConverter()
+    return [format_task(doc, ticks) for doc in docs]
@@ -11,6 +11,7 @@ Parameters:
     team (str, optional): Filter op team
     project_number (str, optional): Filter op project nummer
     title_contains (str, optional): Zoek in titel (case-insensitive)
+    search_engine (str, optional): "text", "atlas" of "regex" (default: TASKS_SEARCH_ENGINE)
     has_notes (bool, optional): Alleen taken met notities
     has_subtasks (bool, optional): Alleen taken met subtaken
     has_incomplete_subtasks (bool, optional): Alleen taken met onvoltooide subtaken
@@ -18,11 +19,67 @@ Parameters:
     sort_by (str, optional): "deadline" of "created"
     sort_ascending (bool, optional): Sorteer oplopend (default: True voor deadline, False voor created)
     limit (int, optional): Maximum aantal resultaten (default: 100)
+    mode (str, optional): "documents" (default), "count" of "facets"
+    facets (list[str], optional): Groeperingen voor mode "facets",
+        uit "status", "type", "team", "project_status" (default: status, type, team)
+    formatting (str, optional): "server" (FORMAT_TASKS op Atlas) of "client"
+        (ruwe velden ophalen en formatteren in de worker), default: TASKS_FORMATTING of "server"
+
+Mode "count" geeft [{"total": n}] terug, mode "facets" daarnaast per facet
+een {label: aantal} dict. Beide werken op de ruwe velden, zonder FORMAT_TASKS,
+en doen enkel een $lookup als een filter of facet project data nodig heeft.
+
+Met formatting "client" filtert de pipeline op de ruwe velden (RawTaskFilters),
+sorteert op dezelfde datum strings als FORMAT_TASKS en haalt enkel
+RAW_TASK_PROJECTION op; formatters.format_tasks geeft dan dezelfde output.
 """
+import os
+import logging
 from typing import Any, Dict, List
+from pymongo.errors import OperationFailure
 from .base import BaseAggregation
-from .pipelines import JOIN_PROJECTS, FORMAT_TASKS
-from .filters import TaskFilters
+from .formatters import RAW_TASK_PROJECTION, format_tasks
+from .pipelines import (
+    JOIN_PROJECTS,
+    FORMAT_TASKS,
+    TASK_STATUS_LABELS,
+    TASK_TYPE_LABELS,
+    PROJECT_STATUS_LABELS,
+    UNKNOWN_LABEL,
+    convert_dotnet_ticks_to_date,
+)
+from .filters import TaskFilters, RawTaskFilters
+from .search import RegexSearch, get_search_engine
+
+# MongoDB error code als de text index ontbreekt voor $text
+INDEX_NOT_FOUND = 27
+
+MODES = ("documents", "count", "facets")
+DEFAULT_FACETS = ["status", "type", "team"]
+FORMATTING = ("server", "client")
+
+# Facet naam -> (ruw veld, label mapping, default is ruwe waarde)
+FACET_FIELDS = {
+    "status": ("$Status", TASK_STATUS_LABELS, False),
+    "type": ("$Type", TASK_TYPE_LABELS, True),
+    "team": ("$Team", None, True),
+    "project_status": ("$ProjectDetails.Status", PROJECT_STATUS_LABELS, False),
+}
+
+
+def _formatting(params: Dict[str, Any]) -> str:
+    formatting = params.get("formatting") or os.environ.get("TASKS_FORMATTING") or "server"
+    if formatting not in FORMATTING:
+        raise ValueError(f"Unknown formatting '{formatting}'. Available: {list(FORMATTING)}")
+    return formatting
+
+
+def _as_list(value) -> List:
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [value]
+    return list(value)
 
 
 class GetTasksAggregation(BaseAggregation):
@@ -31,9 +88,35 @@ class GetTasksAggregation(BaseAggregation):
     database = "erpDb"
     collection = "Tasks"
 
+    # Zware leesquery: mag van een secondary komen die max. 90s achterloopt
+    read_preference = "secondaryPreferred"
+    max_staleness_seconds = 90
+
+    source_collections = ["Tasks", "Projects"]
+
+    def __init__(self, search_engine=None):
+        self.search_engine = search_engine
+
     def build_pipeline(self, params: Dict[str, Any]) -> List[Dict]:
         pipeline = []
 
+        engine = self.search_engine or get_search_engine(params.get("search_engine"))
+        title_contains = params.get("title_contains")
+        if not title_contains or not str(title_contains).strip():
+            title_contains = None
+
+        mode = params.get("mode") or "documents"
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode '{mode}'. Available: {list(MODES)}")
+        if mode != "documents":
+            return self._build_count_pipeline(params, engine, title_contains, mode)
+        if _formatting(params) == "client":
+            return self._build_client_format_pipeline(params, engine, title_contains)
+
+        # === STAP 0: Zoeken via index (moet de eerste stage zijn) ===
+        if title_contains:
+            pipeline.extend(engine.first_stages(title_contains))
+
         # === STAP 1: Join met Projects ===
         pipeline.extend(JOIN_PROJECTS)
 
@@ -71,10 +154,9 @@ class GetTasksAggregation(BaseAggregation):
         if project_number and str(project_number).strip():
             pipeline.extend(TaskFilters.by_project_number(str(project_number).strip()))
 
-        # Title search
-        title_contains = params.get("title_contains")
-        if title_contains and str(title_contains).strip():
-            pipeline.extend(TaskFilters.by_title(title_contains))
+        # Title search (regex fallback werkt op geformatteerde data)
+        if title_contains:
+            pipeline.extend(engine.formatted_stages(title_contains))
 
         # Has notes filter
         if params.get("has_notes"):
@@ -108,3 +190,129 @@ class GetTasksAggregation(BaseAggregation):
         pipeline.extend(TaskFilters.limit(params.get("limit")))
 
         return pipeline
+
+    def _raw_task_filters(self, params: Dict[str, Any]) -> List[Dict]:
+        """Filters op ruwe task velden (alles behalve titel en project)."""
+        pipeline = []
+        pipeline.extend(RawTaskFilters.by_status(_as_list(params.get("status"))))
+        pipeline.extend(RawTaskFilters.by_type(_as_list(params.get("type"))))
+        pipeline.extend(RawTaskFilters.by_user(str(params.get("user_id") or "").strip()))
+        pipeline.extend(RawTaskFilters.by_team(str(params.get("team") or "").strip()))
+        if params.get("has_notes"):
+            pipeline.extend(RawTaskFilters.has_notes())
+        if params.get("has_subtasks"):
+            pipeline.extend(RawTaskFilters.has_subtasks())
+        if params.get("has_incomplete_subtasks"):
+            pipeline.extend(RawTaskFilters.has_incomplete_subtasks())
+        return pipeline
+
+    def _build_client_format_pipeline(self, params: Dict[str, Any], engine, title_contains) -> List[Dict]:
+        """Zelfde selectie en volgorde als de server pipeline, maar zonder FORMAT_TASKS."""
+        pipeline = []
+
+        if title_contains:
+            pipeline.extend(engine.first_stages(title_contains))
+            # Zoek filters die normaal na FORMAT_TASKS lopen, op het ruwe veld
+            if engine.formatted_stages(title_contains):
+                pipeline.extend(engine.raw_stages(title_contains))
+
+        pipeline.extend(self._raw_task_filters(params))
+
+        # Zonder project filters kan de $lookup na de $limit (hij verandert de selectie niet)
+        project_number = str(params.get("project_number") or "").strip()
+        project_status = _as_list(params.get("project_status"))
+        join_first = bool(project_number or project_status)
+        if join_first:
+            pipeline.extend(JOIN_PROJECTS)
+            pipeline.extend(RawTaskFilters.by_project_number(project_number))
+            pipeline.extend(RawTaskFilters.by_project_status(project_status))
+
+        # Sorteren op dezelfde "dd-mm-jjjj" strings als FORMAT_TASKS, voor dezelfde volgorde;
+        # _id als tiebreaker komt overeen met taskId (hex string van dezelfde ObjectId)
+        sort_by = params.get("sort_by")
+        if sort_by in ("deadline", "created"):
+            field = "$DueDate" if sort_by == "deadline" else "$CreatedOn"
+            ascending = params.get("sort_ascending", sort_by == "deadline")
+            pipeline.append({"$addFields": {"_sortKey": convert_dotnet_ticks_to_date(field)}})
+            pipeline.append({"$sort": {"_sortKey": 1 if ascending else -1, "_id": 1}})
+
+        pipeline.extend(TaskFilters.limit(params.get("limit")))
+        if not join_first:
+            pipeline.extend(JOIN_PROJECTS)
+        pipeline.append({"$project": RAW_TASK_PROJECTION})
+        return pipeline
+
+    def _build_count_pipeline(self, params: Dict[str, Any], engine, title_contains, mode: str) -> List[Dict]:
+        """Tellingen op ruwe velden: geen FORMAT_TASKS, $lookup enkel indien nodig."""
+        pipeline = []
+
+        if title_contains:
+            pipeline.extend(engine.raw_stages(title_contains))
+
+        pipeline.extend(self._raw_task_filters(params))
+
+        facets = (_as_list(params.get("facets")) or DEFAULT_FACETS) if mode == "facets" else []
+        unknown = [f for f in facets if f not in FACET_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown facets {unknown}. Available: {list(FACET_FIELDS)}")
+
+        # Project data enkel joinen als een filter of facet ze nodig heeft
+        project_number = str(params.get("project_number") or "").strip()
+        project_status = _as_list(params.get("project_status"))
+        if project_number or project_status or "project_status" in facets:
+            pipeline.extend(JOIN_PROJECTS)
+            pipeline.extend(RawTaskFilters.by_project_number(project_number))
+            pipeline.extend(RawTaskFilters.by_project_status(project_status))
+
+        if mode == "count":
+            pipeline.append({"$count": "total"})
+            return pipeline
+
+        facet_stages = {"total": [{"$count": "total"}]}
+        for facet in facets:
+            facet_stages[facet] = [{"$group": {"_id": FACET_FIELDS[facet][0], "count": {"$sum": 1}}}]
+        pipeline.append({"$facet": facet_stages})
+        return pipeline
+
+    @staticmethod
+    def _label_counts(groups: List[Dict], label_map, default_is_raw: bool) -> Dict[str, int]:
+        """Zet [{_id: ruwe waarde, count}] om naar {label: aantal}, zoals FORMAT_TASKS labelt."""
+        counts = {}
+        for group in groups:
+            raw = group["_id"]
+            label = None
+            if label_map is not None and not isinstance(raw, bool):
+                try:
+                    label = label_map.get(raw)
+                except TypeError:  # niet hashbaar (array/document): nooit gelijk
+                    label = None
+            if label is None:
+                label = str(raw) if default_is_raw and raw is not None else UNKNOWN_LABEL
+            counts[label] = counts.get(label, 0) + group["count"]
+        return dict(sorted(counts.items(), key=lambda item: -item[1]))
+
+    def execute(self, client, params: Dict[str, Any], read_preference=None) -> List[Dict]:
+        """Voer uit, met fallback naar regex als de text index ontbreekt."""
+        try:
+            documents = super().execute(client, params, read_preference)
+        except OperationFailure as e:
+            engine = self.search_engine or get_search_engine(params.get("search_engine"))
+            if e.code != INDEX_NOT_FOUND or isinstance(engine, RegexSearch):
+                raise
+            logging.warning("Text index ontbreekt op Tasks, fallback naar regex zoeken")
+            self.search_engine = RegexSearch()
+            documents = super().execute(client, params, read_preference)
+
+        mode = params.get("mode") or "documents"
+        if mode == "count":
+            return [{"total": documents[0]["total"] if documents else 0}]
+        if mode == "facets":
+            facets = documents[0]
+            result = {"total": facets.pop("total")[0]["total"] if facets["total"] else 0}
+            for facet, groups in facets.items():
+                _, label_map, default_is_raw = FACET_FIELDS[facet]
+                result[facet] = self._label_counts(groups, label_map, default_is_raw)
+            return [result]
+        if _formatting(params) == "client":
+            return format_tasks(documents)
+        return documents
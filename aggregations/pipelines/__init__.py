@@ -1,5 +1,32 @@
 # Pipeline blokken voor MongoDB aggregations
 from .join_projects import JOIN_PROJECTS
-from .format_tasks import FORMAT_TASKS
+from .format_tasks import (
+    FORMAT_TASKS,
+    TASK_STATUS_LABELS,
+    TASK_TYPE_LABELS,
+    PROJECT_STATUS_LABELS,
+    PROJECT_TYPE_LABELS,
+    UNKNOWN_LABEL,
+    convert_dotnet_ticks_to_date,
+)
+from .task_dashboard import (
+    DASHBOARD_COLLECTION,
+    DASHBOARD_SCOPES,
+    became_overdue_filter,
+    build_dashboard_pipeline,
+)
 
-__all__ = ["JOIN_PROJECTS", "FORMAT_TASKS"]
+__all__ = [
+    "JOIN_PROJECTS",
+    "FORMAT_TASKS",
+    "TASK_STATUS_LABELS",
+    "TASK_TYPE_LABELS",
+    "PROJECT_STATUS_LABELS",
+    "PROJECT_TYPE_LABELS",
+    "UNKNOWN_LABEL",
+    "convert_dotnet_ticks_to_date",
+    "DASHBOARD_COLLECTION",
+    "DASHBOARD_SCOPES",
+    "became_overdue_filter",
+    "build_dashboard_pipeline",
+]
@@ -76,6 +76,21 @@ PROJECT_TYPE_MAP = [
 ]
 
 
+def _switch_lookup(branches: list) -> dict:
+    """Zet $switch branches om naar een {ruwe waarde: label} dict."""
+    return {branch["case"]["$eq"][1]: branch["then"] for branch in branches}
+
+
+# Dezelfde mappings als dict lookups, voor werk op ruwe velden (filters, counts)
+TASK_STATUS_LABELS = _switch_lookup(TASK_STATUS_MAP)
+TASK_TYPE_LABELS = _switch_lookup(TASK_TYPE_MAP)
+PROJECT_STATUS_LABELS = _switch_lookup(PROJECT_STATUS_MAP)
+PROJECT_TYPE_LABELS = _switch_lookup(PROJECT_TYPE_MAP)
+
+# Label voor waarden die niet in een mapping staan (default van de $switch)
+UNKNOWN_LABEL = "Onbekend"
+
+
 def _convert_dotnet_ticks_to_date(field_path: str, date_format: str = "%d-%m-%Y") -> dict:
     """
     Converteer .NET ticks naar MongoDB date string.
@@ -97,6 +112,10 @@ def _convert_dotnet_ticks_to_date(field_path: str, date_format: str = "%d-%m-%Y"
     }
 
 
+# Publieke naam voor pipelines die dezelfde datum strings nodig hebben (bv. sorteren zoals FORMAT_TASKS)
+convert_dotnet_ticks_to_date = _convert_dotnet_ticks_to_date
+
+
 FORMAT_TASKS = [
     {
         "$project": {
@@ -0,0 +1,125 @@
+"""
+Pipeline blok: Dashboard samenvattingen per gebruiker of team
+
+Berekent uit Tasks (+ Projects) per sleutel:
+- Totaal, open en overdue taken
+- Onvoltooide subtaken in open taken
+- Aantal taken per status en open taken per project status (zelfde labels als FORMAT_TASKS)
+
+Het resultaat wordt met $merge in de DASHBOARD_COLLECTION geschreven, met
+_id "<scope>:<sleutel>" zodat een dashboard read een enkele _id lookup is.
+"""
+from datetime import datetime, timezone
+from typing import List, Optional
+from .join_projects import JOIN_PROJECTS
+from .format_tasks import TASK_STATUS_MAP, PROJECT_STATUS_MAP, TASK_STATUS_LABELS
+
+DASHBOARD_COLLECTION = "TaskDashboard"
+
+# Scope -> ruw veld waarop gegroepeerd wordt
+DASHBOARD_SCOPES = {
+    "user": "UserId",
+    "team": "Team",
+}
+
+CLOSED_STATUS = next(raw for raw, label in TASK_STATUS_LABELS.items() if label == "Gesloten")
+
+# Huidig moment in .NET ticks (zelfde epoch offset als _convert_dotnet_ticks_to_date)
+TICKS_AT_EPOCH = 621355968000000000
+_NOW_TICKS = {"$add": [{"$multiply": [{"$toLong": "$$NOW"}, 10000]}, TICKS_AT_EPOCH]}
+_DUE_TICKS = {"$arrayElemAt": ["$DueDate", 0]}
+
+IS_OPEN = {"$ne": ["$Status", CLOSED_STATUS]}
+IS_OVERDUE = {"$and": [IS_OPEN, {"$gt": [_DUE_TICKS, 0]}, {"$lt": [_DUE_TICKS, _NOW_TICKS]}]}
+INCOMPLETE_SUBTASKS = {
+    "$size": {
+        "$filter": {
+            "input": {"$ifNull": ["$TaskList", []]},
+            "as": "s",
+            "cond": {"$ne": ["$$s.Completed", True]}
+        }
+    }
+}
+
+
+def _to_ticks(moment: datetime) -> int:
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    delta = moment - datetime(1970, 1, 1, tzinfo=timezone.utc)
+    return TICKS_AT_EPOCH + (delta.days * 86400 + delta.seconds) * 10**7 + delta.microseconds * 10
+
+
+def became_overdue_filter(start: datetime, end: datetime) -> dict:
+    """
+    Filter op open taken waarvan de deadline in [start, end) viel.
+
+    Die taken zijn in die periode overdue geworden zonder dat er een write
+    (en dus een change event) voor nodig was.
+    """
+    return {"Status": {"$ne": CLOSED_STATUS}, "DueDate.0": {"$gte": _to_ticks(start), "$lt": _to_ticks(end)}}
+
+
+def _count_if(condition: dict) -> dict:
+    return {"$sum": {"$cond": [condition, 1, 0]}}
+
+
+def build_dashboard_pipeline(scope: str, keys: Optional[List[str]] = None, run_id: str = None) -> List[dict]:
+    """
+    Bouw de pipeline die de samenvattingen voor een scope (her)berekent.
+
+    Args:
+        scope: "user" of "team"
+        keys: Enkel deze gebruikers/teams herberekenen (default: alle)
+        run_id: Wordt op elk document gezet, om achteraf verouderde te verwijderen
+    """
+    if scope not in DASHBOARD_SCOPES:
+        raise ValueError(f"Unknown dashboard scope '{scope}'. Available: {list(DASHBOARD_SCOPES)}")
+    field = DASHBOARD_SCOPES[scope]
+
+    key_match = {"$nin": [None, ""]}
+    if keys is not None:
+        key_match["$in"] = list(keys)
+
+    group = {
+        "_id": f"${field}",
+        "totalTasks": {"$sum": 1},
+        "openTasks": _count_if(IS_OPEN),
+        "overdueTasks": _count_if(IS_OVERDUE),
+        "incompleteSubtasks": {"$sum": {"$cond": [IS_OPEN, INCOMPLETE_SUBTASKS, 0]}},
+        "tasksWithIncompleteSubtasks": _count_if({"$and": [IS_OPEN, {"$gt": [INCOMPLETE_SUBTASKS, 0]}]}),
+    }
+    # Tellers per label, rechtstreeks uit de $switch branches van FORMAT_TASKS
+    for i, branch in enumerate(TASK_STATUS_MAP):
+        group[f"s{i}"] = _count_if(branch["case"])
+    for i, branch in enumerate(PROJECT_STATUS_MAP):
+        group[f"p{i}"] = _count_if({"$and": [IS_OPEN, branch["case"]]})
+
+    return [
+        {"$match": {field: key_match}},
+        *JOIN_PROJECTS,
+        {"$group": group},
+        {
+            "$project": {
+                "_id": {"$concat": [f"{scope}:", {"$toString": "$_id"}]},
+                "scope": {"$literal": scope},
+                "key": "$_id",
+                "totalTasks": 1,
+                "openTasks": 1,
+                "overdueTasks": 1,
+                "incompleteSubtasks": 1,
+                "tasksWithIncompleteSubtasks": 1,
+                "statusCounts": {b["then"]: f"$s{i}" for i, b in enumerate(TASK_STATUS_MAP)},
+                "openTasksPerProjectStatus": {b["then"]: f"$p{i}" for i, b in enumerate(PROJECT_STATUS_MAP)},
+                "runId": {"$literal": run_id},
+                "updatedAt": "$$NOW",
+            }
+        },
+        {
+            "$merge": {
+                "into": DASHBOARD_COLLECTION,
+                "on": "_id",
+                "whenMatched": "replace",
+                "whenNotMatched": "insert"
+            }
+        }
+    ]
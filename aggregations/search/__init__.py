@@ -0,0 +1,9 @@
+# Zoek engines voor title_contains in task aggregations
+from .task_search import (
+    RegexSearch,
+    TextIndexSearch,
+    AtlasSearch,
+    get_search_engine,
+)
+
+__all__ = ["RegexSearch", "TextIndexSearch", "AtlasSearch", "get_search_engine"]
@@ -0,0 +1,116 @@
+"""
+Zoek engines voor de title_contains parameter.
+
+Een engine levert pipeline stages op twee plaatsen:
+    first_stages:     helemaal vooraan, op de ruwe velden (Title/Description),
+                      zodat de zoekopdracht een index kan gebruiken
+    formatted_stages: na FORMAT_TASKS, op de geformatteerde output
+
+Beschikbare engines:
+    RegexSearch:     $regex op 'titel' na formatting (substring, geen index)
+    TextIndexSearch: $text op een text index over Title + Description
+    AtlasSearch:     Atlas Search $search op Title + Description
+
+$text en $search zoeken op woorden in plaats van substrings, en sorteren op
+relevantie zolang er geen sort_by meegegeven wordt.
+
+Configuratie via environment variabelen:
+    TASKS_SEARCH_ENGINE: "text" (default), "atlas" of "regex"
+    TASKS_ATLAS_SEARCH_INDEX: naam van de Atlas Search index; als deze gezet is
+        wordt standaard AtlasSearch gebruikt
+
+Benodigde text index:
+    db.Tasks.createIndex(
+        {Title: "text", Description: "text"},
+        {weights: {Title: 5, Description: 1}, default_language: "dutch"}
+    )
+"""
+import os
+from typing import List, Optional
+from ..filters import TaskFilters
+
+SEARCH_FIELDS = ["Title", "Description"]
+
+
+class RegexSearch:
+    """Case-insensitive $regex op de geformatteerde titel (oude gedrag)."""
+
+    name = "regex"
+
+    def first_stages(self, search_term: str) -> List[dict]:
+        return []
+
+    def formatted_stages(self, search_term: str) -> List[dict]:
+        return TaskFilters.by_title(search_term)
+
+    def raw_stages(self, search_term: str) -> List[dict]:
+        """Zelfde filter op het ruwe 'Title' veld (voor pipelines zonder FORMAT_TASKS)."""
+        if not search_term or not str(search_term).strip():
+            return []
+        return [{"$match": {"Title": {"$regex": str(search_term).strip(), "$options": "i"}}}]
+
+
+class TextIndexSearch:
+    """$text zoekopdracht op de text index, gesorteerd op textScore."""
+
+    name = "text"
+
+    def first_stages(self, search_term: str) -> List[dict]:
+        stages = self.raw_stages(search_term)
+        if stages:
+            stages.append({"$sort": {"score": {"$meta": "textScore"}}})
+        return stages
+
+    def formatted_stages(self, search_term: str) -> List[dict]:
+        return []
+
+    def raw_stages(self, search_term: str) -> List[dict]:
+        if not search_term or not str(search_term).strip():
+            return []
+        return [{"$match": {"$text": {"$search": str(search_term).strip()}}}]
+
+
+class AtlasSearch:
+    """Atlas Search $search op Title en Description (resultaten al op relevantie)."""
+
+    name = "atlas"
+
+    def __init__(self, index: str = "default"):
+        self.index = index
+
+    def first_stages(self, search_term: str) -> List[dict]:
+        return self.raw_stages(search_term)
+
+    def formatted_stages(self, search_term: str) -> List[dict]:
+        return []
+
+    def raw_stages(self, search_term: str) -> List[dict]:
+        if not search_term or not str(search_term).strip():
+            return []
+        return [{
+            "$search": {
+                "index": self.index,
+                "text": {"query": str(search_term).strip(), "path": SEARCH_FIELDS}
+            }
+        }]
+
+
+def get_search_engine(name: Optional[str] = None):
+    """
+    Kies de zoek engine op basis van naam of environment configuratie.
+
+    Args:
+        name: "regex", "text" of "atlas" (default: TASKS_SEARCH_ENGINE)
+    """
+    atlas_index = os.environ.get("TASKS_ATLAS_SEARCH_INDEX")
+    if not name:
+        name = os.environ.get("TASKS_SEARCH_ENGINE") or ("atlas" if atlas_index else "text")
+
+    name = str(name).strip().lower()
+    if name == "regex":
+        return RegexSearch()
+    if name == "text":
+        return TextIndexSearch()
+    if name == "atlas":
+        return AtlasSearch(atlas_index or "default")
+    raise ValueError(f"Unknown search engine '{name}'. Available: ['regex', 'text', 'atlas']")
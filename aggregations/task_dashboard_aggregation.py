@@ -0,0 +1,275 @@
+"""
+Task Dashboard Aggregations
+
+Leest voorberekende dashboard samenvattingen uit de TaskDashboard collection
+(zie pipelines/task_dashboard.py). Een read is een enkele _id lookup.
+
+Parameters (dashboard_user):
+    user_id (str, optional): Samenvatting van deze gebruiker (default: alle gebruikers)
+
+Parameters (dashboard_team):
+    team (str, optional): Samenvatting van dit team (default: alle teams)
+
+De samenvattingen worden bijgehouden door TaskDashboardSync:
+- Incrementeel: change stream events op Tasks en Projects sinds de vorige
+  resume tokens, enkel de geraakte gebruikers/teams worden herberekend. Een
+  wijziging aan de status van een project herberekent de gebruikers en teams
+  van alle taken met die ProjectId (nodig voor openTasksPerProjectStatus).
+  overdueTasks hangt af van de tijd: ook de gebruikers/teams van open taken
+  waarvan de DueDate sinds de vorige run verstreken is worden herberekend
+- Volledig: een $merge run over alle taken, bij de eerste run, als het token
+  verlopen is, als een wijziging niet toe te wijzen is, of elke
+  DASHBOARD_FULL_REFRESH_HOURS uur (default 24) als reconciliatie
+
+Voor de incrementele herberekening zijn indexes op Tasks.UserId, Tasks.Team,
+Tasks.ProjectId en Tasks.DueDate.0 nodig. Een taak die naar een ander project verhuist blijft bij
+dezelfde gebruiker en hetzelfde team; die sleutels komen uit de post-image.
+Met changeStreamPreAndPostImages op Tasks worden ook deletes en verhuizingen
+naar een ander team incrementeel verwerkt, anders volgt een volledige run.
+"""
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set
+from pymongo.errors import OperationFailure
+from .base import BaseAggregation
+from .pipelines import (
+    DASHBOARD_COLLECTION, DASHBOARD_SCOPES, became_overdue_filter, build_dashboard_pipeline,
+)
+
+
+class UserDashboardAggregation(BaseAggregation):
+    """Dashboard samenvatting per gebruiker."""
+
+    database = "erpDb"
+    collection = DASHBOARD_COLLECTION
+
+    # Samenvattingen (ook overdueTasks) lopen zelf tot 5 minuten achter, secondaries volstaan
+    read_preference = "secondaryPreferred"
+    max_staleness_seconds = 300
+
+    def build_pipeline(self, params: Dict[str, Any]) -> List[Dict]:
+        user_id = str(params.get("user_id") or "").strip()
+        if user_id:
+            return [{"$match": {"_id": f"user:{user_id}"}}]
+        return [{"$match": {"scope": "user"}}, {"$sort": {"key": 1}}]
+
+
+class TeamDashboardAggregation(BaseAggregation):
+    """Dashboard samenvatting per team."""
+
+    database = "erpDb"
+    collection = DASHBOARD_COLLECTION
+
+    # Samenvattingen (ook overdueTasks) lopen zelf tot 5 minuten achter, secondaries volstaan
+    read_preference = "secondaryPreferred"
+    max_staleness_seconds = 300
+
+    def build_pipeline(self, params: Dict[str, Any]) -> List[Dict]:
+        team = str(params.get("team") or "").strip()
+        if team:
+            return [{"$match": {"_id": f"team:{team}"}}]
+        return [{"$match": {"scope": "team"}}, {"$sort": {"key": 1}}]
+
+
+class TaskDashboardSync:
+    """Houdt de TaskDashboard collection bij vanuit change events en $merge runs."""
+
+    database = "erpDb"
+    source_collection = "Tasks"
+    project_collection = "Projects"
+    collection = DASHBOARD_COLLECTION
+
+    STATE_ID = "_sync_state"
+    MAX_EVENTS = 5000
+    MAX_AWAIT_MS = 500
+    # Overlap voor klokverschil tussen de function en $$NOW op de server
+    DUE_OVERLAP = timedelta(minutes=5)
+    # ChangeStreamHistoryLost / ChangeStreamFatalError
+    RESUME_TOKEN_EXPIRED_CODES = (280, 286)
+
+    def __init__(self, full_refresh_hours: Optional[float] = None):
+        if full_refresh_hours is None:
+            full_refresh_hours = float(os.environ.get("DASHBOARD_FULL_REFRESH_HOURS", 24))
+        self.full_refresh_interval = timedelta(hours=full_refresh_hours)
+
+    def refresh(self, client, keys: Optional[Dict[str, Set[str]]] = None) -> None:
+        """
+        Herbereken samenvattingen met $merge en verwijder verouderde documenten.
+
+        Args:
+            keys: {scope: {sleutels}} om enkel die te herberekenen (default: alles)
+        """
+        db = client[self.database]
+        run_id = uuid.uuid4().hex
+        for scope in DASHBOARD_SCOPES:
+            scope_keys = None if keys is None else sorted(keys.get(scope, ()))
+            if scope_keys == []:
+                continue
+            db[self.source_collection].aggregate(build_dashboard_pipeline(scope, scope_keys, run_id))
+
+            # Sleutels zonder taken komen niet meer uit de pipeline
+            stale = {"scope": scope, "runId": {"$ne": run_id}}
+            if scope_keys is not None:
+                stale["key"] = {"$in": scope_keys}
+            db[self.collection].delete_many(stale)
+
+    def _current_token(self, collection) -> Dict:
+        """Resume token van "nu", op te halen voor een volledige refresh."""
+        with collection.watch(max_await_time_ms=1) as stream:
+            stream.try_next()
+            return stream.resume_token
+
+    def _collect_changes(self, tasks, resume_token: Dict):
+        """
+        Lees change events en verzamel de geraakte sleutels per scope.
+
+        Returns:
+            (keys, needs_full_refresh, nieuw resume token, aantal events)
+        """
+        keys = {scope: set() for scope in DASHBOARD_SCOPES}
+        needs_full = False
+        count = 0
+        with tasks.watch(
+            full_document="updateLookup",
+            full_document_before_change="whenAvailable",
+            resume_after=resume_token,
+            max_await_time_ms=self.MAX_AWAIT_MS,
+        ) as stream:
+            while count < self.MAX_EVENTS:
+                event = stream.try_next()
+                if event is None:
+                    break
+                count += 1
+                op = event["operationType"]
+                if op not in ("insert", "update", "replace", "delete"):
+                    # drop, rename, invalidate, ...
+                    needs_full = True
+                    break
+
+                before = event.get("fullDocumentBeforeChange")
+                after = event.get("fullDocument")
+                changed = set((event.get("updateDescription") or {}).get("updatedFields", {}))
+                changed |= set((event.get("updateDescription") or {}).get("removedFields", []))
+                moved = op == "replace" or any(DASHBOARD_SCOPES[s] in changed for s in DASHBOARD_SCOPES)
+
+                # Zonder pre-image weten we niet bij welke gebruiker/team een taak zat
+                if before is None and (op == "delete" or moved or after is None):
+                    needs_full = True
+                    break
+
+                for doc in (before, after):
+                    if not doc:
+                        continue
+                    for scope, field in DASHBOARD_SCOPES.items():
+                        if doc.get(field):
+                            keys[scope].add(doc[field])
+            token = stream.resume_token
+        return keys, needs_full, token, count
+
+    def _collect_project_changes(self, projects, tasks, resume_token: Dict):
+        """
+        Lees change events op Projects en zoek de gebruikers/teams van hun taken.
+
+        Enkel inserts, deletes, replaces en wijzigingen aan Status tellen mee.
+
+        Returns:
+            (keys, needs_full_refresh, nieuw resume token, aantal events)
+        """
+        keys = {scope: set() for scope in DASHBOARD_SCOPES}
+        project_ids = set()
+        needs_full = False
+        count = 0
+        with projects.watch(resume_after=resume_token, max_await_time_ms=self.MAX_AWAIT_MS) as stream:
+            while count < self.MAX_EVENTS:
+                event = stream.try_next()
+                if event is None:
+                    break
+                count += 1
+                op = event["operationType"]
+                if op not in ("insert", "update", "replace", "delete"):
+                    needs_full = True
+                    break
+                changed = (event.get("updateDescription") or {})
+                if op == "update" and "Status" not in changed.get("updatedFields", {}) \
+                        and "Status" not in changed.get("removedFields", []):
+                    continue
+                project_ids.add(str(event["documentKey"]["_id"]))
+            token = stream.resume_token
+
+        if project_ids and not needs_full:
+            # Taken verwijzen naar hun project met de ObjectId als string
+            fields = {field: 1 for field in DASHBOARD_SCOPES.values()}
+            for task in tasks.find({"ProjectId": {"$in": sorted(project_ids)}}, fields):
+                for scope, field in DASHBOARD_SCOPES.items():
+                    if task.get(field):
+                        keys[scope].add(task[field])
+        return keys, needs_full, token, count
+
+    def _collect_due_keys(self, tasks, since: datetime, until: datetime) -> Dict[str, Set[str]]:
+        """Gebruikers/teams van open taken die tussen `since` en `until` overdue werden."""
+        keys = {scope: set() for scope in DASHBOARD_SCOPES}
+        fields = {field: 1 for field in DASHBOARD_SCOPES.values()}
+        for task in tasks.find(became_overdue_filter(since - self.DUE_OVERLAP, until), fields):
+            for scope, field in DASHBOARD_SCOPES.items():
+                if task.get(field):
+                    keys[scope].add(task[field])
+        return keys
+
+    def sync(self, client) -> Dict[str, Any]:
+        """Verwerk wijzigingen sinds de vorige run. Geeft statistieken terug voor logging."""
+        db = client[self.database]
+        tasks = db[self.source_collection]
+        projects = db[self.project_collection]
+        state_coll = db[self.collection]
+        state = state_coll.find_one({"_id": self.STATE_ID}) or {}
+        now = datetime.now(timezone.utc)
+
+        last_full = state.get("lastFullRefresh")
+        if last_full is not None and last_full.tzinfo is None:
+            last_full = last_full.replace(tzinfo=timezone.utc)
+        full = (
+            not state.get("resumeToken")
+            or not state.get("projectsResumeToken")
+            or last_full is None
+            or now - last_full >= self.full_refresh_interval
+        )
+
+        keys, events, token, project_token = None, 0, None, None
+        if not full:
+            try:
+                keys, full, token, events = self._collect_changes(tasks, state["resumeToken"])
+                if not full:
+                    project_keys, full, project_token, project_events = self._collect_project_changes(
+                        projects, tasks, state["projectsResumeToken"],
+                    )
+                    events += project_events
+                    for scope, scope_keys in project_keys.items():
+                        keys[scope] |= scope_keys
+                if not full:
+                    last_sync = state.get("lastSync") or last_full
+                    if last_sync.tzinfo is None:
+                        last_sync = last_sync.replace(tzinfo=timezone.utc)
+                    for scope, scope_keys in self._collect_due_keys(tasks, last_sync, now).items():
+                        keys[scope] |= scope_keys
+            except OperationFailure as e:
+                if e.code not in self.RESUME_TOKEN_EXPIRED_CODES:
+                    raise
+                full = True
+
+        update = {"resumeToken": token, "projectsResumeToken": project_token, "lastSync": now}
+        if full:
+            # Tokens eerst ophalen, zodat wijzigingen tijdens de refresh niet verloren gaan
+            update["resumeToken"] = self._current_token(tasks)
+            update["projectsResumeToken"] = self._current_token(projects)
+            self.refresh(client)
+            update["lastFullRefresh"] = now
+        elif any(keys.values()):
+            self.refresh(client, keys)
+
+        state_coll.update_one({"_id": self.STATE_ID}, {"$set": update}, upsert=True)
+        return {
+            "mode": "full" if full else "incremental",
+            "events": events,
+            "keys": {scope: len(k) for scope, k in (keys or {}).items()},
+        }
@@ -0,0 +1 @@
+# Benchmark scripts, draaien tegen een lokale mongod (niet mee gedeployed)
@@ -0,0 +1,130 @@
+"""
+Benchmark: gedrag van de circuit breaker als een lokale mongod stopt en herstart.
+
+Start een eigen mongod (--mongod, tijdelijke dbpath), stuurt met --threads
+workers findOne/find requests door mongodb_dataapi_replace en stopt de mongod
+na --warmup seconden voor --outage seconden. Rapporteert per fase het aantal
+200/503 responses en de latency (p50/p99), en de hersteltijd: van het
+herstarten van mongod tot de eerste 200 en tot de read breaker weer closed is.
+
+Gebruik:
+    python -m benchmarks.circuit_recovery --mongod mongod --port 27999 --outage 20
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from pymongo import MongoClient
+from .seed import BENCH_DATABASE, seed
+
+
+def start_mongod(binary: str, port: int, dbpath: str) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [binary, "--port", str(port), "--dbpath", dbpath, "--bind_ip", "127.0.0.1"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    client = MongoClient(port=port, serverSelectionTimeoutMS=500)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            client.admin.command("ping")
+            return process
+        except Exception:
+            time.sleep(0.1)
+    raise RuntimeError("mongod did not start")
+
+
+def percentile(values: list, q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mongod", default="mongod")
+    parser.add_argument("--port", type=int, default=27999)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--warmup", type=float, default=5)
+    parser.add_argument("--outage", type=float, default=20)
+    parser.add_argument("--after", type=float, default=20, help="seconden meten na de herstart")
+    parser.add_argument("--deadline", type=float, default=10, help="REQUEST_DEADLINE_SECONDS voor de reads")
+    args = parser.parse_args()
+
+    dbpath = tempfile.mkdtemp(prefix="circuit-bench-")
+    os.environ["MONGODBATLAS_CLUSTER_CONNECTIONSTRING"] = f"mongodb://127.0.0.1:{args.port}/"
+    os.environ["REQUEST_DEADLINE_SECONDS"] = str(args.deadline)
+    # Na de configuratie importeren: breakers lezen hun instellingen bij het laden
+    import azure.functions as func
+    import function_app
+
+    handler = function_app.mongodb_dataapi_replace.build().get_user_function()
+    process = start_mongod(args.mongod, args.port, dbpath)
+    seed(MongoClient(port=args.port), 2000)
+
+    bodies = {
+        "findOne": {"database": BENCH_DATABASE, "collection": "Tasks", "filter": {"Status": 1}},
+        "find": {"database": BENCH_DATABASE, "collection": "Tasks", "filter": {"Team": "Planning"}, "limit": 20},
+    }
+    phase = {"name": "warmup"}
+    samples = defaultdict(list)
+    first_ok = {}
+    stop = threading.Event()
+
+    def worker(index: int):
+        ops = list(bodies)
+        i = index
+        while not stop.is_set():
+            op = ops[i % len(ops)]
+            i += 1
+            req = func.HttpRequest("POST", f"/api/mdb_dataapi/action/{op}", route_params={"operation": op},
+                                   body=json.dumps(bodies[op]).encode(), headers={"Content-Type": "application/json"})
+            start = time.monotonic()
+            status = handler(req).status_code
+            end = time.monotonic()
+            samples[(phase["name"], status)].append((end - start) * 1000)
+            if phase["name"] == "recovery" and status == 200:
+                first_ok.setdefault("at", end)
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(args.threads)]
+    try:
+        for thread in threads:
+            thread.start()
+        time.sleep(args.warmup)
+
+        phase["name"] = "outage"
+        process.terminate()
+        process.wait()
+        time.sleep(args.outage)
+
+        phase["name"] = "recovery"
+        restarted = time.monotonic()
+        process = start_mongod(args.mongod, args.port, dbpath)
+        closed_at = None
+        while time.monotonic() - restarted < args.after:
+            if closed_at is None and function_app.BREAKERS["read"].state == "closed" and "at" in first_ok:
+                closed_at = time.monotonic()
+            time.sleep(0.05)
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join(timeout=15)
+        process.terminate()
+        process.wait()
+        shutil.rmtree(dbpath, ignore_errors=True)
+
+    print(f"{'phase':<10} {'status':>6} {'requests':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    for (name, status), timings in sorted(samples.items()):
+        print(f"{name:<10} {status:>6} {len(timings):>9} {percentile(timings, 0.5):>9.1f} {percentile(timings, 0.99):>9.1f}")
+    if "at" in first_ok:
+        print(f"first 200 after restart: {first_ok['at'] - restarted:.2f}s")
+    if closed_at:
+        print(f"read breaker closed after restart: {closed_at - restarted:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark: FORMAT_TASKS op Atlas (server) vs formatters.format_tasks in de worker (client).
+
+Per formatting mode wordt gemeten:
+    cluster ms: som van de 'millis' uit de database profiler (aggregate + getMore)
+    worker ms:  CPU tijd van het Python proces (driver decoding + formatting)
+
+Controleert ook of beide modes byte-identieke JSON in dezelfde volgorde opleveren.
+
+Gebruik:
+    python -m benchmarks.formatting_cpu --uri mongodb://localhost:27017 --tasks 100000 --limit 5000
+"""
+import argparse
+import json
+import time
+import uuid
+from pymongo import MongoClient
+from aggregations.get_tasks_aggregation import GetTasksAggregation
+from aggregations.formatters import format_tasks
+from .seed import BENCH_DATABASE, seed
+
+
+def run(db, params: dict, runs: int):
+    """Voer get_tasks `runs` keer uit met een uniek comment, geef (docs, cluster ms, worker ms) terug."""
+    aggregation = GetTasksAggregation()
+    pipeline = aggregation.build_pipeline(params)
+    client_side = params["formatting"] == "client"
+    tag = f"bench-{params['formatting']}-{uuid.uuid4().hex}"
+
+    worker_ms = 0.0
+    documents = []
+    for _ in range(runs):
+        start = time.process_time()
+        documents = list(db.Tasks.aggregate(pipeline, comment=tag))
+        if client_side:
+            documents = format_tasks(documents)
+        worker_ms += (time.process_time() - start) * 1000
+
+    cluster_ms = sum(
+        entry.get("millis", 0)
+        for entry in db.system.profile.find({"$or": [{"command.comment": tag}, {"originatingCommand.comment": tag}]})
+    )
+    return documents, cluster_ms / runs, worker_ms / runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument("--tasks", type=int, default=100000)
+    parser.add_argument("--limit", type=int, default=5000)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--skip-seed", action="store_true")
+    args = parser.parse_args()
+
+    client = MongoClient(args.uri)
+    if not args.skip_seed:
+        seed(client, args.tasks)
+    db = client[BENCH_DATABASE]
+    db.command("profile", 2)
+
+    params = {"sort_by": "created", "limit": args.limit}
+    results = {}
+    try:
+        for formatting in ("server", "client"):
+            results[formatting] = run(db, dict(params, formatting=formatting), args.runs)
+    finally:
+        db.command("profile", 0)
+
+    print(f"{'formatting':<10} {'cluster ms':>11} {'worker ms':>10}")
+    for formatting, (_, cluster_ms, worker_ms) in results.items():
+        print(f"{formatting:<10} {cluster_ms:>11.1f} {worker_ms:>10.1f}")
+
+    server_json = [json.dumps(doc) for doc in results["server"][0]]
+    client_json = [json.dumps(doc) for doc in results["client"][0]]
+    print(f"byte-identical output (same order): {server_json == client_json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Benchmark: doorvoer van de parallelle split-scan per aantal partities.
+
+Seed een Tasks collection en leest ze volledig (find zonder limit, met en
+zonder sort) via parallel_aggregate met 1, 2, 4, 8 en 16 partities. Rapporteert
+mediaan tijd en documenten per seconde; 1 partitie is de seriele referentie.
+
+Gebruik:
+    python -m benchmarks.parallel_scan --uri mongodb://localhost:27017 --tasks 200000
+"""
+import argparse
+import statistics
+import time
+from pymongo import MongoClient
+from dataapi.parallel_scan import parallel_aggregate
+from .seed import BENCH_DATABASE, seed
+
+PIPELINES = {
+    "unsorted": [{"$match": {"Status": {"$lt": 5}}}, {"$project": {"Notes": 0}}],
+    "sorted": [{"$match": {"Status": {"$lt": 5}}}, {"$sort": {"UserId": 1, "Title": -1}}, {"$project": {"Notes": 0}}],
+}
+
+
+def measure(collection, pipeline: list, partitions: int, runs: int, method: str):
+    timings, count = [], 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        count = len(parallel_aggregate(collection, pipeline, partitions, split_method=method))
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument("--tasks", type=int, default=200000)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--partitions", default="1,2,4,8,16")
+    parser.add_argument("--split-method", default="sample", choices=["sample", "bucketAuto"])
+    parser.add_argument("--skip-seed", action="store_true")
+    args = parser.parse_args()
+
+    client = MongoClient(args.uri, maxPoolSize=32)
+    if not args.skip_seed:
+        seed(client, args.tasks)
+    collection = client[BENCH_DATABASE].Tasks
+
+    print(f"{'pipeline':<10} {'partitions':>10} {'median s':>10} {'docs/s':>12} {'speedup':>8}")
+    for name, pipeline in PIPELINES.items():
+        baseline = None
+        for partitions in (int(p) for p in args.partitions.split(",")):
+            seconds, count = measure(collection, pipeline, partitions, args.runs, args.split_method)
+            baseline = baseline or seconds
+            print(f"{name:<10} {partitions:>10} {seconds:>10.2f} {count / seconds:>12.0f} {baseline / seconds:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
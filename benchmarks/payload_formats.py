@@ -0,0 +1,107 @@
+"""
+Benchmark: JSON vs BSON vs MessagePack voor grote insertMany/find payloads.
+
+Meet per formaat de CPU tijd om een batch taken te decoderen (request) en te
+encoderen (response), plus het aantal bytes. JSON volgt het pad van
+function_app.py (str(_id) + DateTimeEncoder), BSON het RawBSONDocument pad
+waarbij documenten als bytes van en naar de driver gaan. Heeft geen mongod nodig.
+
+Gebruik:
+    python -m benchmarks.payload_formats --docs 10000
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime
+import bson
+from bson import ObjectId
+from bson.raw_bson import RawBSONDocument
+from dataapi.formats import BSON, MSGPACK, encode_body, decode_body
+from .seed import make_task
+
+
+class DateTimeEncoder(json.JSONEncoder):
+    # Kopie van function_app.DateTimeEncoder, zodat dit zonder azure.functions draait
+    def default(self, o):
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def make_documents(count: int) -> list:
+    rng = random.Random(1)
+    project_ids = [ObjectId() for _ in range(50)]
+    docs = []
+    for _ in range(count):
+        doc = make_task(rng, project_ids)
+        doc["_id"] = ObjectId()
+        doc["ModifiedOn"] = datetime(2024, 5, 1, 12, 30)
+        docs.append(doc)
+    return docs
+
+
+def cpu_ms(fn, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        start = time.process_time()
+        fn()
+        elapsed = (time.process_time() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench_json(docs, repeat):
+    def to_json():
+        out = []
+        for doc in docs:
+            doc = dict(doc)
+            doc["_id"] = str(doc["_id"])
+            out.append(doc)
+        return json.dumps({"documents": out}, cls=DateTimeEncoder).encode()
+
+    body = to_json()
+    return len(body), cpu_ms(lambda: json.loads(body), repeat), cpu_ms(to_json, repeat)
+
+
+def bench_bson(docs, repeat):
+    raw_docs = [RawBSONDocument(bson.encode(doc)) for doc in docs]
+    body = encode_body({"documents": raw_docs}, BSON)
+    return len(body), cpu_ms(lambda: decode_body(body, BSON, raw=True)["documents"], repeat), \
+        cpu_ms(lambda: encode_body({"documents": raw_docs}, BSON), repeat)
+
+
+def bench_msgpack(docs, repeat):
+    def to_msgpack():
+        out = []
+        for doc in docs:
+            doc = dict(doc)
+            doc["_id"] = str(doc["_id"])
+            out.append(doc)
+        return encode_body({"documents": out}, MSGPACK)
+
+    body = to_msgpack()
+    return len(body), cpu_ms(lambda: decode_body(body, MSGPACK), repeat), cpu_ms(to_msgpack, repeat)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--docs", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    docs = make_documents(args.docs)
+    results = {
+        "json": bench_json(docs, args.repeat),
+        "bson (raw)": bench_bson(docs, args.repeat),
+        "msgpack": bench_msgpack(docs, args.repeat),
+    }
+
+    print(f"{args.docs} documents, best of {args.repeat}")
+    print(f"{'format':<12} {'bytes':>12} {'decode ms':>10} {'encode ms':>10}")
+    for name, (size, decode, encode) in results.items():
+        print(f"{name:<12} {size:>12,} {decode:>10.1f} {encode:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
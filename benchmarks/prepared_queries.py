@@ -0,0 +1,77 @@
+"""
+Benchmark: request grootte en parse tijd van een volledige aggregate body
+tegenover een prepared query (handle + parameters).
+
+De pipeline is die van get_tasks (server formatting, met filters) met de
+gebruiker als parameter. Gemeten wordt wat de worker per request doet voor de
+query bij de driver terechtkomt:
+    inline:   json.loads van de volledige body
+    prepared: json.loads van {"handle", "params"} + lookup in de per-worker
+              cache + invullen van het gecompileerde template
+Heeft geen mongod nodig: de definitie staat in de registry cache.
+
+Gebruik:
+    python -m benchmarks.prepared_queries --requests 5000
+"""
+import argparse
+import json
+import time
+from aggregations.get_tasks_aggregation import GetTasksAggregation
+from dataapi.prepared import PreparedQuery, PreparedQueryRegistry, bind_request, compute_handle
+
+PARAMS = {"status": ["Open", "In uitvoering"], "team": "Planning", "sort_by": "deadline", "limit": 100}
+
+
+def definition() -> dict:
+    pipeline = GetTasksAggregation().build_pipeline(PARAMS)
+    return {
+        "operation": "aggregate",
+        "database": "erpDb",
+        "collection": "Tasks",
+        "pipeline": [{"$match": {"UserId": {"$param": "user"}}}] + pipeline,
+        "params": {"user": {"type": "string"}},
+    }
+
+
+def best_us(fn, requests: int, repeat: int = 5) -> float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(requests):
+            fn()
+        elapsed = (time.perf_counter() - start) / requests * 1e6
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    spec = definition()
+    handle = compute_handle(spec)
+    registry = PreparedQueryRegistry(path="", cache_size=16)
+    registry._remember(PreparedQuery(handle, spec))
+
+    query = {key: spec[key] for key in ("database", "collection")}
+    query["pipeline"] = [{"$match": {"UserId": "user-7"}}] + spec["pipeline"][1:]
+    inline_body = json.dumps(query).encode("utf-8")
+    prepared_body = json.dumps({"handle": handle, "params": {"user": "user-7"}}).encode("utf-8")
+
+    def prepared():
+        return bind_request(registry, None, json.loads(prepared_body))
+
+    # Beide paden leveren dezelfde pipeline aan de driver
+    assert prepared()[1]["pipeline"] == json.loads(inline_body)["pipeline"]
+
+    inline_us = best_us(lambda: json.loads(inline_body), args.requests)
+    prepared_us = best_us(prepared, args.requests)
+    print(f"{'path':<10} {'bytes':>8} {'us/request':>12}")
+    print(f"{'inline':<10} {len(inline_body):>8} {inline_us:>12.1f}")
+    print(f"{'prepared':<10} {len(prepared_body):>8} {prepared_us:>12.1f}")
+    print(f"pipeline stages: {len(query['pipeline'])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Replay van een gecapturede trace (dataapi.capture) tegen een lokale mongod.
+
+Elke request wordt opnieuw opgebouwd als func.HttpRequest in het originele
+request/response formaat en door dezelfde handler gestuurd als in productie
+(mongodb_dataapi_replace of mongodb_custom_aggregation). De onderlinge timing
+uit de trace wordt gevolgd, versneld met --speedup (0 = zo snel mogelijk),
+met maximaal --concurrency requests tegelijk.
+
+Rapporteert per operatie het aantal requests, fouten (status >= 400 of een
+exception) en de latency percentielen, naast de latency die bij de capture
+gemeten werd.
+Geredacteerde waarden ("~<hash>") matchen geen echte data; de vorm van de
+workload (operaties, pipelines, parameters) blijft wel gelijk. Writes waarvan
+de hele body geredacteerd werd (TRAFFIC_CAPTURE_REDACT_BODIES) kunnen niet
+opnieuw uitgevoerd worden en worden overgeslagen; zet daarvoor dezelfde
+TRAFFIC_CAPTURE_REDACT_BODIES als bij de capture.
+
+Gebruik:
+    python -m benchmarks.replay_traffic --trace dataapi-trace.jsonl.gz \\
+        --uri mongodb://localhost:27017 --speedup 4 --concurrency 16
+"""
+import argparse
+import gzip
+import os
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from bson import json_util
+from bson.json_util import RELAXED_JSON_OPTIONS
+from dataapi.capture import has_redacted_body
+from dataapi.etags import WRITE_OPERATIONS
+from dataapi.formats import JSON, encode_body
+
+ROUTES = {"action": ("mdb_dataapi/action", "operation"), "custom": ("mdb_dataapi/custom", "aggregation_name")}
+
+
+def read_trace(path: str) -> list:
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        records = [json_util.loads(line) for line in f if line.strip()]
+    return sorted(records, key=lambda record: record["ts"])
+
+
+def build_request(func, record: dict):
+    prefix, param = ROUTES[record["route"]]
+    body = record.get("body")
+    if body is None:
+        data = b""
+    elif record["fmt"] == JSON:
+        # Extended JSON terug, zoals de client $oid/$date in JSON meestuurt
+        data = json_util.dumps(body, json_options=RELAXED_JSON_OPTIONS).encode("utf-8")
+    else:
+        data = encode_body(body, record["fmt"])
+    return func.HttpRequest(
+        "POST", f"/api/{prefix}/{record['op']}", body=data,
+        route_params={param: record["op"]},
+        headers={"Content-Type": record["fmt"], "Accept": record["accept"]},
+    )
+
+
+def percentile(values: list, q: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * q))] if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trace", required=True)
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument("--speedup", type=float, default=1.0, help="0 = zonder wachten")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--skip-writes", action="store_true", help="enkel reads en custom aggregations")
+    args = parser.parse_args()
+
+    # function_app leest de connection string bij de eerste request
+    os.environ["MONGODBATLAS_CLUSTER_CONNECTIONSTRING"] = args.uri
+    import azure.functions as func
+    import function_app
+
+    handlers = {
+        "action": function_app.mongodb_dataapi_replace.build().get_user_function(),
+        "custom": function_app.mongodb_custom_aggregation.build().get_user_function(),
+    }
+    records = read_trace(args.trace)
+    if args.skip_writes:
+        records = [r for r in records if not (r["route"] == "action" and r["op"] in WRITE_OPERATIONS)]
+    redacted = [r for r in records if has_redacted_body(r.get("body"))]
+    if redacted:
+        print(f"Skipping {len(redacted)} writes with a redacted body")
+        records = [r for r in records if not has_redacted_body(r.get("body"))]
+    if not records:
+        print("Trace is empty")
+        return
+
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+
+    def replay(record: dict):
+        start = time.perf_counter()
+        try:
+            status = handlers[record["route"]](build_request(func, record)).status_code
+        except Exception as e:
+            print(f"{record['route']}/{record['op']} failed: {e}")
+            status = 500
+        elapsed = (time.perf_counter() - start) * 1000
+        key = f"{record['route']}/{record['op']}"
+        with lock:
+            latencies[key].append(elapsed)
+            if status >= 400:
+                errors[key] += 1
+
+    first_ts = records[0]["ts"]
+    started = time.perf_counter()
+    futures = []
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        for record in records:
+            if args.speedup > 0:
+                delay = (record["ts"] - first_ts) / args.speedup - (time.perf_counter() - started)
+                if delay > 0:
+                    time.sleep(delay)
+            futures.append(executor.submit(replay, record))
+    for future in futures:
+        future.result()
+    duration = time.perf_counter() - started
+
+    captured = defaultdict(list)
+    for record in records:
+        captured[f"{record['route']}/{record['op']}"].append(record["ms"])
+
+    print(f"{len(records)} requests in {duration:.1f}s ({len(records) / duration:.1f} req/s), "
+          f"speedup {args.speedup or 'max'}, concurrency {args.concurrency}")
+    print(f"{'operation':<28} {'count':>6} {'errors':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'capt p50':>9}")
+    for key in sorted(latencies):
+        values = sorted(latencies[key])
+        print(f"{key:<28} {len(values):>6} {errors[key]:>6} {percentile(values, 0.5):>8.1f} "
+              f"{percentile(values, 0.95):>8.1f} {percentile(values, 0.99):>8.1f} {values[-1]:>8.1f} "
+              f"{percentile(sorted(captured[key]), 0.5):>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
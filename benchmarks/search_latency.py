@@ -0,0 +1,61 @@
+"""
+Benchmark: latency van title_contains per zoek engine (regex, text, atlas).
+
+Seed een grote Tasks collection, maakt de text index aan en meet de
+get_tasks aggregation per engine (mediaan en p95 over --runs herhalingen).
+
+Gebruik:
+    python -m benchmarks.search_latency --uri mongodb://localhost:27017 --tasks 200000
+"""
+import argparse
+import statistics
+import time
+from pymongo import MongoClient
+from aggregations.get_tasks_aggregation import GetTasksAggregation
+from aggregations.search import get_search_engine
+from .seed import BENCH_DATABASE, seed
+
+TERMS = ["lekkage", "factuur", "isolatie", "werf"]
+
+
+class BenchGetTasks(GetTasksAggregation):
+    database = BENCH_DATABASE
+
+
+def measure(client, engine_name: str, runs: int) -> list:
+    timings = []
+    for i in range(runs):
+        aggregation = BenchGetTasks(search_engine=get_search_engine(engine_name))
+        start = time.perf_counter()
+        aggregation.execute(client, {"title_contains": TERMS[i % len(TERMS)], "limit": 100})
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument("--tasks", type=int, default=200000)
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--engines", default="regex,text", help="bv. regex,text,atlas (atlas vereist Atlas Search)")
+    parser.add_argument("--skip-seed", action="store_true")
+    args = parser.parse_args()
+
+    client = MongoClient(args.uri)
+    if not args.skip_seed:
+        seed(client, args.tasks)
+    client[BENCH_DATABASE].Tasks.create_index(
+        [("Title", "text"), ("Description", "text")],
+        weights={"Title": 5, "Description": 1},
+        default_language="dutch",
+    )
+
+    print(f"{'engine':<8} {'median ms':>10} {'p95 ms':>10}")
+    for name in args.engines.split(","):
+        timings = sorted(measure(client, name.strip(), args.runs))
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        print(f"{name:<8} {statistics.median(timings):>10.1f} {p95:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Seed een lokale database met synthetische Tasks en Projects.
+
+De documenten volgen de structuur die FORMAT_TASKS verwacht (.NET ticks als
+[ticks, offset] arrays, Notes, TaskList, ProjectDetails met Contacts, ...).
+
+Gebruik:
+    python -m benchmarks.seed --uri mongodb://localhost:27017 --tasks 200000
+"""
+import argparse
+import random
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import MongoClient
+
+BENCH_DATABASE = "erpDb_bench"
+TICKS_AT_EPOCH = 621355968000000000
+
+WORDS = [
+    "dak", "goot", "lekkage", "offerte", "factuur", "herstelling", "isolatie",
+    "planning", "opmeting", "klacht", "schilderwerk", "ramen", "deur", "vloer",
+    "elektriciteit", "sanitair", "betaling", "contract", "werf", "materiaal",
+]
+TEAMS = ["Binnendienst", "Buitendienst", "Planning", "Boekhouding", "Verkoop"]
+CITIES = [("Gent", "9000"), ("Antwerpen", "2000"), ("Brugge", "8000"), ("Leuven", "3000")]
+
+
+def to_ticks(moment: datetime) -> list:
+    """Zet een datetime om naar het [ticks, offset] formaat van .NET."""
+    delta = moment - datetime(1970, 1, 1)
+    ticks = TICKS_AT_EPOCH + (delta.days * 86400 + delta.seconds) * 10**7 + delta.microseconds * 10
+    return [ticks, 0]
+
+
+def _sentence(rng: random.Random, length: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(length)).capitalize()
+
+
+def make_project(rng: random.Random) -> dict:
+    city, zip_code = rng.choice(CITIES)
+    return {
+        "_id": ObjectId(),
+        "Name": _sentence(rng, 3),
+        "ProjectNumber": f"PR/2024/{rng.randint(1, 9999):04d}",
+        "Status": rng.choice([0, 1, 2, 3, 4, 5, 6, 7, 9, 10, 11, 12, 13, 14, 15, 16, 17, 18, 19]),
+        "Type": rng.randint(0, 6),
+        "ExecutedPercentage": rng.choice([0, 10, 25, 50, 75, 100, 33.5]),
+        "Address": {"Addressline1": f"Straat {rng.randint(1, 200)}", "Zip": zip_code, "City": city},
+        "CustomerReference": f"KR-{rng.randint(1000, 9999)}",
+        "RequestedExecutionDate": to_ticks(datetime(2024, 1, 1) + timedelta(days=rng.randint(0, 700))),
+        "Measurements": [{} for _ in range(rng.randint(0, 3))],
+        "OpenQuotations": rng.randint(0, 4),
+        "Stats": {"EstimatedTurnover": rng.randint(1000, 90000)},
+        "Contacts": [
+            {"Tags": ["Klant"], "Contact": {"DisplayName": "Klant " + _sentence(rng, 1),
+                                            "Phone": "0470000000", "Email": "klant@example.com"}},
+            {"Tags": ["Architect"], "Contact": {"DisplayName": "Architect"}},
+        ],
+        "WebUrl": "https://example.sharepoint.com/sites/project",
+    }
+
+
+def make_task(rng: random.Random, project_ids: list) -> dict:
+    created = datetime(2024, 1, 1) + timedelta(minutes=rng.randint(0, 1000000))
+    return {
+        "Title": _sentence(rng, rng.randint(2, 6)),
+        "Description": _sentence(rng, rng.randint(5, 30)),
+        "Status": rng.randint(0, 5),
+        "Type": rng.randint(0, 20),
+        "DueDate": to_ticks(created + timedelta(days=rng.randint(-30, 60))),
+        "CreatedOn": to_ticks(created),
+        "UserId": f"user-{rng.randint(1, 50)}",
+        "Team": rng.choice(TEAMS),
+        "ProjectId": str(rng.choice(project_ids)) if rng.random() < 0.9 else "",
+        "Notes": [
+            {"Message": _sentence(rng, 8), "Username": "Gebruiker", "UserId": "user-1",
+             "Moment": to_ticks(created + timedelta(hours=i))}
+            for i in range(rng.randint(0, 3))
+        ],
+        "TaskList": [
+            {"Title": _sentence(rng, 3), "Completed": rng.random() < 0.5, "Order": i}
+            for i in range(rng.randint(0, 4))
+        ],
+        "Version": "1.0.2",
+    }
+
+
+def seed(client, tasks: int, projects: int = None, database: str = BENCH_DATABASE, seed_value: int = 42):
+    """Maak de benchmark database opnieuw aan met `tasks` taken."""
+    rng = random.Random(seed_value)
+    projects = projects or max(1, tasks // 20)
+    db = client[database]
+    db.Tasks.drop()
+    db.Projects.drop()
+
+    project_docs = [make_project(rng) for _ in range(projects)]
+    db.Projects.insert_many(project_docs)
+    project_ids = [p["_id"] for p in project_docs]
+
+    batch = []
+    for _ in range(tasks):
+        batch.append(make_task(rng, project_ids))
+        if len(batch) == 5000:
+            db.Tasks.insert_many(batch)
+            batch = []
+    if batch:
+        db.Tasks.insert_many(batch)
+    return db
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uri", default="mongodb://localhost:27017")
+    parser.add_argument("--tasks", type=int, default=100000)
+    args = parser.parse_args()
+    seed(MongoClient(args.uri), args.tasks)
+    print(f"Seeded {args.tasks} tasks in {BENCH_DATABASE}")
+
+
+if __name__ == "__main__":
+    main()
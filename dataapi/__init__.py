@@ -0,0 +1 @@
+# Hulpmodules voor de Data API routes in function_app.py
@@ -0,0 +1,168 @@
+"""
+Opt-in, gesamplede capture van inkomende requests als compacte trace.
+
+Een fractie TRAFFIC_CAPTURE_SAMPLE_RATE (0 = uit, default) van de requests op
+de action en custom routes wordt weggeschreven naar TRAFFIC_CAPTURE_PATH
+(JSON Lines, gzip bij een .gz extensie; default in de temp map), een regel
+per request:
+    {"ts": 1718000000.123, "route": "action", "op": "find", "fmt": "application/json",
+     "accept": "application/json", "status": 200, "ms": 12.4, "body": {...}}
+
+"body" is de geparste request body in relaxed Extended JSON, zodat ObjectIds
+en datums uit BSON/MessagePack requests bij replay hun type behouden.
+
+Redactie: waarden van velden in TRAFFIC_CAPTURE_REDACT_FIELDS (komma lijst,
+hoofdletterongevoelig, op elk niveau, ook als laatste deel van een pad zoals
+"Notes.Message") worden vervangen door "~" + hash van de waarde. De default
+bevat ook de namen uit de FORMAT_TASKS output, waarop get_tasks en aggregate
+$match stages filteren. Gelijke waarden geven dezelfde hash, zodat de vorm van de workload
+(cardinaliteit, herhaling) bewaard blijft. Zet TRAFFIC_CAPTURE_SALT om de
+hashes niet terug te kunnen rekenen via een woordenlijst.
+
+Write bodies (velden van de body in TRAFFIC_CAPTURE_REDACT_BODIES, default
+document, documents en update) worden in hun geheel door een hash vervangen:
+daar kan elk veld persoonsgegevens bevatten. Zet de variabele op "" om ze
+enkel per veld te redacteren, bv. om writes te kunnen replayen.
+
+Capture faalt nooit een request: fouten worden enkel gelogd.
+"""
+import functools
+import gzip
+import hashlib
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+from bson import json_util
+from bson.json_util import RELAXED_JSON_OPTIONS
+from .formats import JSON, decode_body, request_format, response_format
+
+DEFAULT_PATH = os.path.join(tempfile.gettempdir(), "dataapi-trace.jsonl.gz")
+DEFAULT_REDACT_FIELDS = (
+    "Email,Phone,DisplayName,Addressline1,Title,Description,Message,title_contains,"
+    "UserId,user_id,Username,CustomerReference,ProjectNumber,project_number,team,"
+    # FORMAT_TASKS output
+    "titel,beschrijving,toegewezenAan,naam,nummer,locatie,klantReferentie,"
+    "bericht,auteur,auteurId,hoofdcontact,telefoon,email"
+)
+DEFAULT_REDACT_BODIES = "document,documents,update"
+REDACTED_PREFIX = "~"
+
+_lock = threading.Lock()
+_file = None
+_file_path = None
+
+
+def sample_rate() -> float:
+    return float(os.environ.get("TRAFFIC_CAPTURE_SAMPLE_RATE") or 0)
+
+
+def _redact_fields() -> set:
+    value = os.environ.get("TRAFFIC_CAPTURE_REDACT_FIELDS", DEFAULT_REDACT_FIELDS)
+    return {name.strip().lower() for name in value.split(",") if name.strip()}
+
+
+def _redact_bodies() -> set:
+    value = os.environ.get("TRAFFIC_CAPTURE_REDACT_BODIES", DEFAULT_REDACT_BODIES)
+    return {name.strip() for name in value.split(",") if name.strip()}
+
+
+def _hash(value: Any) -> str:
+    salt = os.environ.get("TRAFFIC_CAPTURE_SALT", "")
+    data = salt + json_util.dumps(value, json_options=RELAXED_JSON_OPTIONS, sort_keys=True)
+    return REDACTED_PREFIX + hashlib.sha256(data.encode("utf-8")).hexdigest()[:16]
+
+
+def redact(value: Any, fields: set) -> Any:
+    """Vervang waarden van gevoelige velden (recursief, ook achteraan een pad) door hun hash."""
+    if isinstance(value, dict):
+        return {key: _hash(item) if key.rsplit(".", 1)[-1].lower() in fields else redact(item, fields)
+                for key, item in value.items()}
+    if isinstance(value, list):
+        return [redact(item, fields) for item in value]
+    return value
+
+
+def redact_body(body: Any, bodies: set, fields: set) -> Any:
+    """Redacteer een request body: write bodies in hun geheel, de rest per veld."""
+    if isinstance(body, dict):
+        body = {key: _hash(item) if key in bodies else item for key, item in body.items()}
+    return redact(body, fields)
+
+
+def is_redacted(value: Any) -> bool:
+    return isinstance(value, str) and value.startswith(REDACTED_PREFIX)
+
+
+def has_redacted_body(body: Any) -> bool:
+    """True als een write body (TRAFFIC_CAPTURE_REDACT_BODIES) in zijn geheel geredacteerd werd."""
+    return isinstance(body, dict) and any(is_redacted(body.get(key)) for key in _redact_bodies())
+
+
+def _open():
+    global _file, _file_path
+    path = os.environ.get("TRAFFIC_CAPTURE_PATH") or DEFAULT_PATH
+    if _file is None or _file_path != path:
+        if _file is not None:
+            _file.close()
+        _file = open(path, "ab")
+        _file_path = path
+    return _file
+
+
+def write_record(record: Dict[str, Any]) -> None:
+    data = json_util.dumps(record, json_options=RELAXED_JSON_OPTIONS, separators=(",", ":")).encode("utf-8") + b"\n"
+    # Elke regel een volledig gzip member: de trace blijft leesbaar terwijl er geschreven wordt
+    if (os.environ.get("TRAFFIC_CAPTURE_PATH") or DEFAULT_PATH).endswith(".gz"):
+        data = gzip.compress(data)
+    with _lock:
+        f = _open()
+        f.write(data)
+        f.flush()
+
+
+def _request_body(req) -> Optional[Any]:
+    fmt = request_format(req.headers)
+    if fmt == JSON:
+        return req.get_json() if req.get_body() else None
+    return decode_body(req.get_body(), fmt, False)
+
+
+def capture_traffic(route: str, param: str) -> Callable:
+    """
+    Decorator voor een HTTP handler: capture een sample van de requests.
+
+    Args:
+        route: naam van de route in de trace ("action" of "custom")
+        param: route parameter met de operatie (bv. "operation")
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(req):
+            rate = sample_rate()
+            if rate <= 0 or random.random() >= rate:
+                return handler(req)
+
+            start = time.perf_counter()
+            ts = time.time()
+            response = handler(req)
+            elapsed = (time.perf_counter() - start) * 1000
+            try:
+                write_record({
+                    "ts": round(ts, 3),
+                    "route": route,
+                    "op": req.route_params.get(param),
+                    "fmt": request_format(req.headers),
+                    "accept": response_format(req.headers),
+                    "status": response.status_code,
+                    "ms": round(elapsed, 2),
+                    "body": redact_body(_request_body(req), _redact_bodies(), _redact_fields()),
+                })
+            except Exception as e:
+                logging.warning(f"traffic capture failed: {e}")
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,111 @@
+"""
+Delta-sync: wijzigingen in een collection sinds een resume token.
+
+Gebruikt MongoDB change streams, zodat inserts, updates, replaces en deletes
+allemaal zichtbaar zijn (een Version/timestamp high-water mark ziet geen deletes).
+De client bewaart het teruggegeven `resumeToken` en stuurt het bij de volgende
+call terug. Zonder token start de stream "nu" en krijgt de client enkel een
+token terug om vanaf dat punt te synchroniseren.
+
+Response:
+    changes (list): events met operationType, documentKey, fullDocument,
+        updateDescription en wallTime
+    resumeToken (dict): token om de volgende batch op te halen
+    hasMore (bool): True als de batch vol zat en er mogelijk meer klaarstaat
+    invalidated (bool): True als de stream ongeldig werd (drop/rename),
+        de client moet dan volledig opnieuw synchroniseren via find
+"""
+from typing import Any, Dict, Optional
+from bson import ObjectId
+from pymongo.errors import OperationFailure
+
+DEFAULT_BATCH_SIZE = 100
+MAX_BATCH_SIZE = 1000
+DEFAULT_MAX_AWAIT_MS = 1000
+
+# ChangeStreamHistoryLost / ChangeStreamFatalError: token valt buiten de oplog
+RESUME_TOKEN_EXPIRED_CODES = (280, 286)
+
+
+def _batch_size(value: Any) -> int:
+    """Begrens de batch grootte tussen 1 en MAX_BATCH_SIZE."""
+    try:
+        value = int(value)
+    except (ValueError, TypeError):
+        return DEFAULT_BATCH_SIZE
+    if value <= 0:
+        return DEFAULT_BATCH_SIZE
+    return min(value, MAX_BATCH_SIZE)
+
+
+def _stringify_id(doc: Optional[Dict]) -> Optional[Dict]:
+    if doc is not None and '_id' in doc and isinstance(doc['_id'], ObjectId):
+        doc['_id'] = str(doc['_id'])
+    return doc
+
+
+def _format_event(event: Dict) -> Dict:
+    """Zet een change event om naar een JSON-vriendelijk formaat."""
+    change = {
+        "operationType": event["operationType"],
+        "documentKey": _stringify_id(dict(event.get("documentKey") or {})),
+        "fullDocument": _stringify_id(event.get("fullDocument")),
+        "wallTime": event.get("wallTime"),
+    }
+    if "updateDescription" in event:
+        change["updateDescription"] = {
+            "updatedFields": event["updateDescription"].get("updatedFields", {}),
+            "removedFields": event["updateDescription"].get("removedFields", []),
+        }
+    return change
+
+
+def read_changes(collection, resume_token: Optional[Dict] = None,
+                 batch_size: Any = None, max_await_ms: Any = None) -> Dict[str, Any]:
+    """
+    Lees maximaal `batch_size` wijzigingen sinds `resume_token`.
+
+    Args:
+        collection: pymongo Collection
+        resume_token: token uit een vorige response (None = start vanaf nu)
+        batch_size: maximum aantal events (default 100, max 1000)
+        max_await_ms: hoe lang de server wacht op nieuwe events (default 1000)
+    """
+    if resume_token is not None and not isinstance(resume_token, dict):
+        raise ValueError("resumeToken must be the object returned by a previous changes call")
+
+    limit = _batch_size(batch_size)
+    try:
+        max_await_ms = int(max_await_ms) if max_await_ms is not None else DEFAULT_MAX_AWAIT_MS
+    except (ValueError, TypeError):
+        max_await_ms = DEFAULT_MAX_AWAIT_MS
+
+    changes = []
+    invalidated = False
+    try:
+        with collection.watch(
+            full_document="updateLookup",
+            resume_after=resume_token,
+            max_await_time_ms=max_await_ms,
+            batch_size=limit,
+        ) as stream:
+            while len(changes) < limit:
+                event = stream.try_next()
+                if event is None:
+                    break
+                if event["operationType"] == "invalidate":
+                    invalidated = True
+                    break
+                changes.append(_format_event(event))
+            token = stream.resume_token
+    except OperationFailure as e:
+        if e.code in RESUME_TOKEN_EXPIRED_CODES:
+            raise ValueError("resumeToken is no longer available in the oplog, do a full resync with find") from e
+        raise
+
+    return {
+        "changes": changes,
+        "resumeToken": None if invalidated else token,
+        "hasMore": len(changes) >= limit,
+        "invalidated": invalidated,
+    }
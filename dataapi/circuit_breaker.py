@@ -0,0 +1,209 @@
+"""
+Circuit breaker en retries rond de gepoolde MongoClient.
+
+Tijdens een election of onderhoud blokkeert elke request tot de server
+selection timeout van de driver. Per operatie klasse ("read", "write") houdt
+een breaker het aandeel connectie fouten bij over een rollend venster:
+    closed:    requests lopen door; boven CIRCUIT_FAILURE_RATE (bij minstens
+               CIRCUIT_MIN_REQUESTS requests in CIRCUIT_WINDOW_SECONDS) -> open
+    open:      requests falen meteen (503 + Retry-After). Na
+               CIRCUIT_OPEN_SECONDS doet een enkele request een ping probe
+               (CIRCUIT_PROBE_TIMEOUT_SECONDS); lukt die -> half_open
+    half_open: CIRCUIT_HALF_OPEN_REQUESTS proef requests; allemaal gelukt ->
+               closed, een connectie fout -> terug open
+
+Enkel connectie fouten tellen mee (geen primary, netwerk, timeouts, stepdown);
+een fout in de query zelf betekent dat de cluster gewoon antwoordt. Een
+uitkomst telt enkel in de toestand waarin de request toegelaten werd: een
+request die nog in server selection hing toen de breaker van toestand
+veranderde, wordt genegeerd.
+
+Idempotente reads worden opnieuw geprobeerd met exponentiële backoff en full
+jitter (RETRY_BASE_DELAY_SECONDS, RETRY_MAX_DELAY_SECONDS), zolang dat binnen
+REQUEST_DEADLINE_SECONDS (default 230, de limiet van Azure voor een HTTP
+antwoord) past. Elke poging van zo'n read loopt onder pymongo.timeout met de
+resterende tijd, zodat ook server selection de deadline respecteert. Writes en
+andere operaties zonder retry lopen zonder pymongo.timeout: een afgebroken
+write laat de client in het ongewisse of hij uitgevoerd is.
+
+Een request met meerdere stappen (bv. `execute`: handle binden en daarna de
+query) deelt een deadline via request_deadline().
+"""
+import logging
+import math
+import os
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Optional
+import pymongo
+from pymongo.errors import ConnectionFailure, OperationFailure
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+# NotWritablePrimary, PrimarySteppedDown, ShutdownInProgress en varianten
+STATE_CHANGE_CODES = {91, 189, 10107, 11600, 11602, 13435, 13436}
+
+
+def _env(name: str, default: float) -> float:
+    return float(os.environ.get(name, default))
+
+
+def is_connection_error(err: Exception) -> bool:
+    """True voor fouten die op een onbereikbare of wisselende cluster wijzen."""
+    if isinstance(err, ConnectionFailure):
+        return True
+    return isinstance(err, OperationFailure) and err.code in STATE_CHANGE_CODES
+
+
+class CircuitOpenError(Exception):
+    """De breaker staat open; de request wordt niet naar de cluster gestuurd."""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"MongoDB {name} operations are temporarily unavailable, retry after {math.ceil(retry_after)}s")
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class CircuitBreaker:
+    """Circuit breaker voor een operatie klasse, thread-safe binnen een worker."""
+
+    def __init__(self, name: str, probe: Callable[[], Any], clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.probe = probe
+        self.clock = clock
+        self.failure_rate = _env("CIRCUIT_FAILURE_RATE", 0.5)
+        self.min_requests = int(_env("CIRCUIT_MIN_REQUESTS", 5))
+        self.window_seconds = _env("CIRCUIT_WINDOW_SECONDS", 30)
+        self.open_seconds = _env("CIRCUIT_OPEN_SECONDS", 10)
+        self.half_open_requests = int(_env("CIRCUIT_HALF_OPEN_REQUESTS", 3))
+
+        self.state = CLOSED
+        self._outcomes = deque()
+        self._opened_at = 0.0
+        self._probing = False
+        self._trials = 0
+        self._trial_successes = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def _transition(self, state: str) -> None:
+        logging.warning(f"circuit_breaker {self.name}: {self.state} -> {state}")
+        self.state = state
+        self._generation += 1
+        if state == OPEN:
+            self._opened_at = self.clock()
+        elif state == HALF_OPEN:
+            self._trials = self._trial_successes = 0
+        elif state == CLOSED:
+            self._outcomes.clear()
+
+    def before(self) -> int:
+        """
+        Raise CircuitOpenError als de request niet mag doorgaan.
+
+        Returns:
+            generatie van de toestand waarin de request toegelaten werd, voor record()
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                return self._generation
+            if self.state == HALF_OPEN:
+                if self._trials < self.half_open_requests:
+                    self._trials += 1
+                    return self._generation
+                raise CircuitOpenError(self.name, 1)
+            remaining = self._opened_at + self.open_seconds - self.clock()
+            if remaining > 0 or self._probing:
+                raise CircuitOpenError(self.name, max(remaining, 1))
+            self._probing = True
+
+        # Probe buiten de lock: andere requests falen intussen meteen
+        try:
+            self.probe()
+            healthy = True
+        except Exception as e:
+            logging.warning(f"circuit_breaker {self.name}: probe failed: {e}")
+            healthy = False
+        with self._lock:
+            self._probing = False
+            if not healthy:
+                self._opened_at = self.clock()
+                raise CircuitOpenError(self.name, self.open_seconds)
+            self._transition(HALF_OPEN)
+            self._trials = 1
+            return self._generation
+
+    def record(self, ok: bool, generation: int) -> None:
+        """Registreer de uitkomst van een request die door before() kwam (met diens generatie)."""
+        with self._lock:
+            if generation != self._generation:
+                return
+            if self.state == HALF_OPEN:
+                if not ok:
+                    self._transition(OPEN)
+                    return
+                self._trial_successes += 1
+                if self._trial_successes >= self.half_open_requests:
+                    self._transition(CLOSED)
+                return
+            if self.state != CLOSED:
+                return
+
+            now = self.clock()
+            self._outcomes.append((now, ok))
+            while self._outcomes and self._outcomes[0][0] < now - self.window_seconds:
+                self._outcomes.popleft()
+            failures = sum(1 for _, success in self._outcomes if not success)
+            if len(self._outcomes) >= self.min_requests and failures / len(self._outcomes) >= self.failure_rate:
+                self._transition(OPEN)
+
+
+def ping_probe(get_client: Callable[[], Any], read_preference) -> Callable[[], Any]:
+    """Probe: ping op een node die deze operatie klasse kan bedienen, met korte timeout."""
+    def probe():
+        with pymongo.timeout(_env("CIRCUIT_PROBE_TIMEOUT_SECONDS", 2)):
+            return get_client().admin.command("ping", read_preference=read_preference)
+    return probe
+
+
+def request_deadline() -> float:
+    """Monotone deadline voor een request, REQUEST_DEADLINE_SECONDS vanaf nu."""
+    return time.monotonic() + _env("REQUEST_DEADLINE_SECONDS", 230)
+
+
+def call_with_breaker(breaker: CircuitBreaker, fn: Callable[[], Any], retry: bool = False,
+                      sleep: Callable[[float], Any] = time.sleep, deadline: Optional[float] = None) -> Any:
+    """
+    Voer fn uit via de breaker.
+
+    Met retry=True (enkel voor idempotente reads) loopt elke poging onder
+    pymongo.timeout tot de deadline (default request_deadline()) en worden
+    connectie fouten opnieuw geprobeerd met jittered backoff zolang de deadline
+    dat toelaat. Zonder retry loopt fn een keer, zonder client side timeout.
+    """
+    if deadline is None:
+        deadline = request_deadline()
+    base_delay = _env("RETRY_BASE_DELAY_SECONDS", 0.1)
+    max_delay = _env("RETRY_MAX_DELAY_SECONDS", 2)
+    attempt = 0
+    while True:
+        generation = breaker.before()
+        try:
+            if retry:
+                with pymongo.timeout(max(deadline - time.monotonic(), 0.001)):
+                    result = fn()
+            else:
+                result = fn()
+        except Exception as e:
+            failed = is_connection_error(e)
+            breaker.record(not failed, generation)
+            delay = random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+            if not (retry and failed) or time.monotonic() + delay >= deadline:
+                raise
+            logging.info(f"circuit_breaker {breaker.name}: retry {attempt + 1} after {delay:.2f}s: {e}")
+            sleep(delay)
+            attempt += 1
+            continue
+        breaker.record(True, generation)
+        return result
@@ -0,0 +1,60 @@
+"""
+Tellingen voor de count action, zonder documenten op te halen.
+
+Zonder groupBy is dit een count_documents op de filter. Met groupBy (veld of
+lijst van velden) draait een enkele $facet met per veld een $group, zodat
+het totaal en alle groeperingen in een roundtrip berekend worden.
+
+Response:
+    count (int): aantal documenten dat aan de filter voldoet
+    groups (dict, enkel met groupBy): per veld een lijst van
+        {"value": waarde, "count": aantal}, meest voorkomende eerst
+"""
+from typing import Any, Dict, List, Optional, Union
+from bson import ObjectId
+
+
+def _group_key(index: int) -> str:
+    # $facet output namen mogen geen punten bevatten; op index, zodat "a.b",
+    # "a_b" en "_total" elkaar niet overschrijven
+    return f"group{index}"
+
+
+def count_documents(collection, filter_op: Optional[Dict] = None,
+                    group_by: Union[str, List[str], None] = None) -> Dict[str, Any]:
+    """
+    Tel documenten, optioneel gegroepeerd per veld.
+
+    Args:
+        collection: pymongo Collection
+        filter_op: MongoDB filter (default: alles)
+        group_by: Veldnaam of lijst van veldnamen, bijv. ["Status", "Team"]
+    """
+    filter_op = filter_op or {}
+    if not group_by:
+        return {"count": collection.count_documents(filter_op)}
+
+    fields = [group_by] if isinstance(group_by, str) else list(group_by)
+    facets = {"_total": [{"$count": "count"}]}
+    for i, field in enumerate(fields):
+        if not isinstance(field, str) or not field or field.startswith("$"):
+            raise ValueError("groupBy must be a field name or a list of field names")
+        facets[_group_key(i)] = [
+            {"$group": {"_id": f"${field}", "count": {"$sum": 1}}},
+            {"$sort": {"count": -1}},
+        ]
+
+    pipeline = []
+    if filter_op:
+        pipeline.append({"$match": filter_op})
+    pipeline.append({"$facet": facets})
+    result = next(collection.aggregate(pipeline))
+
+    groups = {}
+    for i, field in enumerate(fields):
+        groups[field] = [
+            {"value": str(g["_id"]) if isinstance(g["_id"], ObjectId) else g["_id"], "count": g["count"]}
+            for g in result[_group_key(i)]
+        ]
+    total = result["_total"][0]["count"] if result["_total"] else 0
+    return {"count": total, "groups": groups}
@@ -0,0 +1,144 @@
+"""
+Strong ETags en conditionele requests (If-None-Match -> 304) voor reads.
+
+Twee soorten ETags:
+    Versie ETag "v<versies>-<request hash>": op basis van een teller per
+        collection die bij elke write via de Data API verhoogd wordt. Bij een
+        match wordt er niets opgehaald of geserialiseerd. Enkel voor collections
+        in DATAAPI_VERSIONED_COLLECTIONS (komma lijst van "db.collection") en
+        reads op de primary: writes buiten de Data API verhogen de teller niet.
+    Resultaat ETag "r<hash>": hash van het resultaat (BSON encoding) en het
+        response formaat. De query loopt wel, maar bij een match wordt de
+        response niet geserialiseerd of verstuurd.
+
+De tellers staan in de `_dataapi_versions` collection van dezelfde database,
+met _id = naam van de collection. Writes op versioned collections verhogen de
+teller in dezelfde transactie als de write (zie versioned_write); daarvoor is
+een replica set nodig, wat op Atlas altijd zo is.
+"""
+import hashlib
+import logging
+import os
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import bson
+
+VERSIONS_COLLECTION = "_dataapi_versions"
+WRITE_OPERATIONS = ("insertOne", "insertMany", "updateOne", "updateMany", "deleteOne", "deleteMany")
+
+
+def _versioned() -> set:
+    value = os.environ.get("DATAAPI_VERSIONED_COLLECTIONS") or ""
+    return {name.strip() for name in value.split(",") if name.strip()}
+
+
+def is_versioned(db: str, collections: Iterable[str]) -> bool:
+    """True als alle collections enkel via de Data API beschreven worden."""
+    versioned = _versioned()
+    collections = list(collections)
+    return bool(collections) and all(f"{db}.{coll}" in versioned for coll in collections)
+
+
+def write_targets(operation: str, db: str, coll: str, payload: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """Collections waarvan de versie na deze actie verhoogd moet worden."""
+    if operation in WRITE_OPERATIONS:
+        return [(db, coll)]
+    targets = []
+    if operation == "aggregate":
+        for stage in payload.get("pipeline") or []:
+            if not isinstance(stage, dict):
+                continue
+            target = stage.get("$out")
+            if "$merge" in stage:
+                target = stage["$merge"].get("into") if isinstance(stage["$merge"], dict) else stage["$merge"]
+            if isinstance(target, str):
+                targets.append((db, target))
+            elif isinstance(target, dict) and target.get("coll"):
+                targets.append((target.get("db", db), target["coll"]))
+    return targets
+
+
+def bump_version(client, db: str, coll: str, session=None) -> None:
+    """Verhoog de versie teller bij een write (enkel voor versioned collections)."""
+    if is_versioned(db, [coll]):
+        client[db][VERSIONS_COLLECTION].update_one(
+            {"_id": coll}, {"$inc": {"version": 1}}, upsert=True, session=session,
+        )
+
+
+def versioned_write(client, targets: List[Tuple[str, str]], write: Callable[[Any], Any],
+                    transactional: bool = True) -> Any:
+    """
+    Voer een write uit zodat de versie tellers van de geraakte collections meebewegen.
+
+    Zonder versioned targets is dit gewoon write(None).
+    transactional (DML writes): write en verhogingen in een transactie, zodat
+        teller en data samen committen of samen falen.
+    Anders ($out/$merge, niet toegelaten in een transactie): verhogen voor de
+        write (faalt dat, dan gebeurt de write niet) en erna. Een mislukte
+        verhoging na een geslaagde write wordt gelogd, niet als fout gemeld.
+
+    Args:
+        write: functie die de write uitvoert met een session (of None)
+    """
+    targets = [(db, coll) for db, coll in targets if is_versioned(db, [coll])]
+    if not targets:
+        return write(None)
+
+    if transactional:
+        def in_transaction(session):
+            result = write(session)
+            for db, coll in targets:
+                bump_version(client, db, coll, session=session)
+            return result
+
+        with client.start_session() as session:
+            return session.with_transaction(in_transaction)
+
+    for db, coll in targets:
+        bump_version(client, db, coll)
+    result = write(None)
+    for db, coll in targets:
+        try:
+            bump_version(client, db, coll)
+        except Exception as e:
+            logging.warning(f"version bump after write failed for {db}.{coll}: {e}")
+    return result
+
+
+def request_key(*parts: Any) -> str:
+    """Hash van alles wat het resultaat bepaalt (route, actie, body, formaat)."""
+    return hashlib.sha256(bson.encode({"p": list(parts)})).hexdigest()[:24]
+
+
+def version_etag(client, db: str, collections: List[str], key: str) -> Optional[str]:
+    """Versie ETag, of None als niet alle bron collections versioned zijn."""
+    if not is_versioned(db, collections):
+        return None
+    versions = {
+        doc["_id"]: doc.get("version", 0)
+        for doc in client[db][VERSIONS_COLLECTION].find({"_id": {"$in": collections}})
+    }
+    stamp = ".".join(str(versions.get(coll, 0)) for coll in collections)
+    return f'"v{stamp}-{key}"'
+
+
+def result_etag(result: Any, fmt: str) -> str:
+    """ETag op basis van het resultaat zelf."""
+    digest = hashlib.sha256(fmt.encode())
+    digest.update(bson.encode({"r": result}))
+    return f'"r{digest.hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    """If-None-Match vergelijking (weak comparison, zoals RFC 9110 voorschrijft)."""
+    if not if_none_match or not etag:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
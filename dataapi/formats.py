@@ -0,0 +1,106 @@
+"""
+Content negotiation voor binaire request/response formaten.
+
+Ondersteunde formaten:
+    application/json:    default, zoals voorheen
+    application/bson:    BSON, behoudt ObjectId/datetime/Decimal128/... types
+    application/msgpack: MessagePack
+
+Het request formaat volgt de Content-Type header, het response formaat de
+Accept header. Bij een BSON response worden find/findOne/aggregate resultaten
+als RawBSONDocument opgehaald en ongewijzigd doorgegeven, zonder ze eerst
+naar Python dicts om te zetten.
+"""
+from datetime import datetime
+from typing import Any, Dict, Optional
+import bson
+import msgpack
+from bson import ObjectId
+from bson.codec_options import CodecOptions
+from bson.raw_bson import RawBSONDocument
+
+JSON = "application/json"
+BSON = "application/bson"
+MSGPACK = "application/msgpack"
+
+_ALIASES = {
+    JSON: JSON,
+    BSON: BSON,
+    MSGPACK: MSGPACK,
+    "application/x-msgpack": MSGPACK,
+    "application/vnd.msgpack": MSGPACK,
+}
+
+# Documenten rechtstreeks als BSON bytes uit de driver halen
+RAW_CODEC_OPTIONS = CodecOptions(document_class=RawBSONDocument)
+
+
+class UnsupportedFormatError(Exception):
+    """Content-Type of Accept waarde die niet ondersteund wordt."""
+
+
+def _media_type(header_value: Optional[str]) -> str:
+    return (header_value or "").split(";")[0].strip().lower()
+
+
+def request_format(headers) -> str:
+    """Bepaal het formaat van de request body uit de Content-Type header (onbekend = JSON, zoals voorheen)."""
+    return _ALIASES.get(_media_type(headers.get("Content-Type")), JSON)
+
+
+def response_format(headers) -> str:
+    """Bepaal het response formaat uit de Accept header (eerste ondersteunde, default JSON)."""
+    for part in (headers.get("Accept") or "").split(","):
+        media_type = _media_type(part)
+        if media_type in _ALIASES:
+            return _ALIASES[media_type]
+    return JSON
+
+
+def decode_body(body: bytes, fmt: str, raw: bool = False) -> Dict[str, Any]:
+    """
+    Parse de request body. JSON wordt door de aanroeper zelf geparsed.
+
+    Args:
+        raw: BSON als RawBSONDocument teruggeven (read-only, zonder decoderen),
+            zodat insertOne/insertMany de bytes zo naar de driver sturen
+    """
+    if not body:
+        return {}
+    if fmt == BSON:
+        return bson.decode(body, RAW_CODEC_OPTIONS if raw else None)
+    if fmt == MSGPACK:
+        return msgpack.unpackb(body, raw=False)
+    raise UnsupportedFormatError(f"Cannot decode '{fmt}' here")
+
+
+def with_id(document):
+    """
+    Zorg dat een te inserten document een _id heeft.
+
+    De driver kan geen _id toevoegen aan een RawBSONDocument; enkel die zonder
+    _id worden daarom (ondiep) naar een dict omgezet.
+    """
+    if "_id" in document:
+        return document
+    document = dict(document)
+    document["_id"] = ObjectId()
+    return document
+
+
+def _msgpack_default(o):
+    # Zelfde representatie als de JSON output (DateTimeEncoder en str(_id))
+    if isinstance(o, datetime):
+        return o.isoformat()
+    if isinstance(o, RawBSONDocument):
+        return dict(o)
+    return str(o)
+
+
+def encode_body(body: Any, fmt: str) -> bytes:
+    """Serialiseer een response body naar BSON of MessagePack."""
+    if fmt == BSON:
+        return bson.encode(body)
+    if fmt == MSGPACK:
+        return msgpack.packb(body, default=_msgpack_default, use_bin_type=True)
+    raise UnsupportedFormatError(f"Cannot encode '{fmt}' here")
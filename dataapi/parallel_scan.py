@@ -0,0 +1,286 @@
+"""
+Parallelle split-scan voor grote find en aggregate resultaten.
+
+De key space wordt in ranges op `_id` (of een andere split key, bv. de shard
+key) opgedeeld aan de hand van split points, waarna elke range als eigen
+cursor op een gedeelde thread pool loopt tegen de gepoolde client. De
+resultaten worden daarna samengevoegd:
+    - met $sort: k-way merge op de sort velden, daarna globaal $skip/$limit
+    - zonder $sort: ranges achter elkaar in key volgorde
+
+Split points:
+    "sample" (default): $sample van ~20 documenten per partitie, kwantielen
+    "bucketAuto": $bucketAuto op de split key, exact maar leest alle keys
+
+Splitsbare pipelines: documentgewijze stages ($match, $project, $addFields,
+$set, $unset, $unwind, $lookup, ...), optioneel gevolgd door $sort, $skip en
+$limit, en daarna enkel nog $project stages (zoals find ze opbouwt).
+
+De split key moet per document een enkele waarde hebben (geen array). Bij
+gemengde types (bv. numerieke en string _ids) worden enkel grenzen van het
+meest voorkomende type gebruikt: range queries vergelijken alleen binnen een
+type, de andere types komen allemaal in de eerste range.
+Sorteren op arrays of sub-documenten wordt benaderd, niet exact zoals MongoDB.
+
+Configuratie via environment variabelen:
+    PARALLEL_SCAN_MAX_WORKERS: grootte van de thread pool (default 8)
+    PARALLEL_SCAN_MAX_PARTITIONS: maximum aantal partities (default 16)
+"""
+import contextvars
+import functools
+import heapq
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from bson import ObjectId, Timestamp, Binary, Decimal128, Regex
+from bson.min_key import MinKey
+from bson.max_key import MaxKey
+
+DEFAULT_PARTITIONS = 4
+SAMPLES_PER_PARTITION = 20
+SORT_KEY_FIELD = "__splitScanSortKey"
+# MinKey, null, object, array en MaxKey: geen bruikbare range grenzen
+UNSPLITTABLE_RANKS = (0, 1, 4, 5, 13)
+
+STREAMING_STAGES = (
+    "$match", "$project", "$addFields", "$set", "$unset", "$unwind",
+    "$lookup", "$replaceRoot", "$replaceWith", "$redact",
+)
+
+_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("PARALLEL_SCAN_MAX_WORKERS", 8)),
+    thread_name_prefix="split-scan",
+)
+
+
+def _max_partitions() -> int:
+    return int(os.environ.get("PARALLEL_SCAN_MAX_PARTITIONS", 16))
+
+
+def parse_options(value: Any) -> Optional[Dict[str, Any]]:
+    """
+    Lees de `parallel` optie uit de request body.
+
+    true | <aantal partities> | {"partitions": n, "splitKey": "_id", "splitMethod": "sample"}
+    """
+    if not value:
+        return None
+    if value is True:
+        value = {}
+    elif isinstance(value, int):
+        value = {"partitions": value}
+    elif not isinstance(value, dict):
+        raise ValueError("parallel must be true, a number of partitions or an object")
+
+    partitions = int(value.get("partitions") or DEFAULT_PARTITIONS)
+    if partitions < 1:
+        raise ValueError("parallel.partitions must be at least 1")
+    method = value.get("splitMethod", "sample")
+    if method not in ("sample", "bucketAuto"):
+        raise ValueError("parallel.splitMethod must be 'sample' or 'bucketAuto'")
+    return {
+        "partitions": min(partitions, _max_partitions()),
+        "split_key": value.get("splitKey", "_id"),
+        "split_method": method,
+    }
+
+
+# === SPLIT POINTS ===
+
+def split_points(collection, partitions: int, split_key: str = "_id",
+                 filter_op: Optional[Dict] = None, method: str = "sample") -> List[Any]:
+    """Bereken maximaal `partitions - 1` oplopende grenzen van een BSON type op de split key."""
+    if partitions <= 1:
+        return []
+    pipeline = [{"$match": filter_op}] if filter_op else []
+    if method == "bucketAuto":
+        pipeline.append({"$bucketAuto": {"groupBy": f"${split_key}", "buckets": partitions}})
+        values = _dominant_type([bucket["_id"]["min"] for bucket in collection.aggregate(pipeline)][1:])
+    else:
+        pipeline.extend([
+            {"$sample": {"size": partitions * SAMPLES_PER_PARTITION}},
+            {"$project": {"_id": 0, "k": f"${split_key}"}},
+            {"$sort": {"k": 1}},
+        ])
+        samples = _dominant_type([doc.get("k") for doc in collection.aggregate(pipeline)])
+        values = [samples[len(samples) * i // partitions] for i in range(1, partitions)] if samples else []
+
+    points = []
+    for value in values:
+        if value is not None and (not points or value != points[-1]):
+            points.append(value)
+    return points
+
+
+def _dominant_type(values: List[Any]) -> List[Any]:
+    """Hou enkel de waarden van het meest voorkomende (splitsbare) BSON type."""
+    ranks = [_type_rank(value) for value in values]
+    counts = {rank: ranks.count(rank) for rank in set(ranks) if rank not in UNSPLITTABLE_RANKS}
+    if not counts:
+        return []
+    dominant = max(counts, key=lambda rank: (counts[rank], -rank))
+    return [value for value, rank in zip(values, ranks) if rank == dominant]
+
+
+def range_filters(points: List[Any], split_key: str = "_id") -> List[Dict]:
+    """
+    Disjuncte filters die samen alle documenten dekken.
+
+    De grenzen moeten van een BSON type zijn (zie split_points): $gte/$lt
+    vergelijken enkel binnen een type. De eerste range is `$not: {$gte: ...}`,
+    zodat ook documenten zonder split key of met een ander type precies een
+    keer gelezen worden.
+    """
+    if not points:
+        return [{}]
+    filters = [{split_key: {"$not": {"$gte": points[0]}}}]
+    for low, high in zip(points, points[1:]):
+        filters.append({split_key: {"$gte": low, "$lt": high}})
+    filters.append({split_key: {"$gte": points[-1]}})
+    return filters
+
+
+# === PIPELINE SPLITSEN ===
+
+def _stage_name(stage: Dict) -> str:
+    return next(iter(stage)) if isinstance(stage, dict) and len(stage) == 1 else None
+
+
+def _split_pipeline(pipeline: List[Dict]):
+    """Verdeel in (prefix, sort, skip, limit, suffix) of raise als dat niet kan."""
+    prefix, sort, skip, limit, suffix = [], None, 0, None, []
+    phase = "prefix"
+    for stage in pipeline:
+        name = _stage_name(stage)
+        if phase == "prefix" and name in STREAMING_STAGES:
+            prefix.append(stage)
+            continue
+        if phase in ("prefix",) and name == "$sort":
+            sort, phase = stage["$sort"], "sort"
+        elif phase in ("prefix", "sort") and name == "$skip":
+            skip, phase = int(stage["$skip"]), "skip"
+        elif phase in ("prefix", "sort", "skip") and name == "$limit":
+            limit, phase = int(stage["$limit"]), "limit"
+        elif phase != "prefix" and name == "$project":
+            suffix.append(stage)
+            phase = "suffix"
+        else:
+            raise ValueError(f"Pipeline cannot be split for parallel execution at stage {name}")
+    return prefix, sort, skip, limit, suffix
+
+
+def _keep_sort_key(project: Dict) -> Dict:
+    """Laat een inclusion $project het hulpveld met de sort waarden behouden."""
+    spec = project["$project"]
+    inclusion = any(not (value in (0, False)) for key, value in spec.items() if key != "_id")
+    if inclusion:
+        return {"$project": {**spec, SORT_KEY_FIELD: 1}}
+    return project
+
+
+# === MERGE ===
+
+def _type_rank(value) -> int:
+    """BSON vergelijkingsvolgorde van types (zoals MongoDB sorteert)."""
+    if isinstance(value, MinKey):
+        return 0
+    if value is None:
+        return 1
+    if isinstance(value, bool):
+        return 9
+    if isinstance(value, (int, float, Decimal128)):
+        return 2
+    if isinstance(value, str):
+        return 3
+    if isinstance(value, dict):
+        return 4
+    if isinstance(value, list):
+        return 5
+    if isinstance(value, (bytes, Binary)):
+        return 6
+    if isinstance(value, ObjectId):
+        return 7
+    if isinstance(value, datetime):
+        return 10
+    if isinstance(value, Timestamp):
+        return 11
+    if isinstance(value, Regex):
+        return 12
+    if isinstance(value, MaxKey):
+        return 13
+    return 8
+
+
+def _compare_values(a, b) -> int:
+    rank_a, rank_b = _type_rank(a), _type_rank(b)
+    if rank_a != rank_b:
+        return -1 if rank_a < rank_b else 1
+    if rank_a in (0, 1, 13):
+        return 0
+    if rank_a == 2:
+        a = a.to_decimal() if isinstance(a, Decimal128) else a
+        b = b.to_decimal() if isinstance(b, Decimal128) else b
+    elif rank_a in (4, 5, 12):
+        a, b = str(a), str(b)
+    return (a > b) - (a < b)
+
+
+def _comparator(directions: List[int]):
+    def compare(doc_a, doc_b) -> int:
+        # Ontbrekende velden staan niet in het hulpdocument en sorteren als null
+        key_a, key_b = doc_a[SORT_KEY_FIELD], doc_b[SORT_KEY_FIELD]
+        for i, direction in enumerate(directions):
+            result = _compare_values(key_a.get(str(i)), key_b.get(str(i)))
+            if result:
+                return result * direction
+        return 0
+    return compare
+
+
+def _run(collection, pipeline: List[Dict]) -> List[Dict]:
+    return list(collection.aggregate(pipeline))
+
+
+def parallel_aggregate(collection, pipeline: List[Dict], partitions: int = DEFAULT_PARTITIONS,
+                       split_key: str = "_id", split_method: str = "sample") -> List[Dict]:
+    """
+    Voer een (splitsbare) pipeline parallel uit over ranges van de split key.
+
+    Args:
+        collection: pymongo Collection (gedeeld tussen threads, pymongo is thread-safe)
+        pipeline: find-achtige of documentgewijze aggregate pipeline
+        partitions: gewenst aantal ranges (kan lager uitvallen bij weinig data)
+        split_key: veld waarop gesplitst wordt, default _id
+        split_method: "sample" of "bucketAuto"
+    """
+    prefix, sort, skip, limit, suffix = _split_pipeline(pipeline)
+
+    # Sample enkel binnen de eerste $match als die op de collection zelf werkt
+    first_match = prefix[0]["$match"] if prefix and _stage_name(prefix[0]) == "$match" else None
+    points = split_points(collection, partitions, split_key, first_match, split_method)
+
+    tail = []
+    if sort:
+        tail.append({"$addFields": {SORT_KEY_FIELD: {str(i): f"${field}" for i, field in enumerate(sort)}}})
+        tail.append({"$sort": sort})
+    if limit is not None:
+        tail.append({"$limit": skip + limit})
+    tail.extend(_keep_sort_key(stage) if sort else stage for stage in suffix)
+
+    partition_pipelines = [[{"$match": rf}] + prefix + tail for rf in range_filters(points, split_key)]
+    # Elke partitie draait in een kopie van de context, zodat pymongo.timeout (deadline) meegaat
+    futures = [_executor.submit(contextvars.copy_context().run, _run, collection, partition)
+               for partition in partition_pipelines]
+    results = [future.result() for future in futures]
+
+    if sort:
+        key = functools.cmp_to_key(_comparator(list(sort.values())))
+        merged = list(heapq.merge(*results, key=key))
+        for doc in merged:
+            doc.pop(SORT_KEY_FIELD, None)
+    else:
+        merged = [doc for partition in results for doc in partition]
+
+    end = skip + limit if limit is not None else None
+    return merged[skip:end]
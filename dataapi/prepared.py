@@ -0,0 +1,286 @@
+"""
+Prepared queries: een geparametriseerde find/aggregate een keer registreren
+en daarna uitvoeren met enkel de handle en de parameters.
+
+Definitie (body van de `prepare` action):
+    {
+        "operation": "aggregate",            # findOne, find, aggregate of count
+        "database": "erpDb", "collection": "Tasks",
+        "pipeline": [{"$match": {"UserId": {"$param": "user"}}}, ...],
+        "params": {"user": {"type": "string"}, "limit": {"type": "int", "default": 50}}
+    }
+Voor findOne/find/count gelden de velden van die actions (filter, sort,
+projection, skip, limit, groupBy) in plaats van pipeline. Elke
+{"$param": "<naam>"} wordt bij uitvoering vervangen door de gebonden waarde.
+Parameters die niet in "params" staan zijn verplicht en van type "any". Een
+"default" wordt bij de registratie een keer omgezet en gevalideerd zoals een
+meegegeven waarde (bv. een objectId default als hex string).
+
+Types: any, string, int, number, bool, objectId, date, array, object.
+objectId en date aanvaarden ook strings (hex resp. ISO 8601).
+
+Handles:
+    - Geregistreerd via `prepare`: "pq_" + hash van de genormaliseerde
+      definitie, opgeslagen in PREPARED_QUERIES_DATABASE (default "dataapi"),
+      collection `prepared_queries`. Dezelfde definitie geeft dezelfde handle
+      en de inhoud achter een handle verandert nooit.
+    - Benoemd in prepared_queries.json (of PREPARED_QUERIES_FILE): naam ->
+      definitie, gevalideerd bij het laden, zoals de AGGREGATIONS registry.
+
+Gevalideerde en gecompileerde queries worden per worker gecached (LRU,
+PREPARED_QUERIES_CACHE_SIZE, default 512). Bij uitvoering wordt enkel nog het
+template ingevuld: delen zonder parameters worden gedeeld, niet gekopieerd.
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+import bson
+from bson import Binary, ObjectId
+from .etags import request_key
+
+PREPARED_COLLECTION = "prepared_queries"
+HANDLE_PREFIX = "pq_"
+DEFAULT_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "prepared_queries.json")
+
+QUERY_FIELDS = {
+    "findOne": ("filter", "projection"),
+    "find": ("filter", "sort", "skip", "limit", "projection"),
+    "aggregate": ("pipeline",),
+    "count": ("filter", "groupBy"),
+}
+# Opties die de client per uitvoering mag meesturen
+PASSTHROUGH = ("readPreference", "parallel")
+
+
+class PreparedQueryNotFound(KeyError):
+    """Onbekende handle."""
+
+    def __str__(self):
+        return f"Prepared query '{self.args[0]}' not found"
+
+
+# === PARAMETER TYPES ===
+
+def _typed(name: str, check: Callable[[Any], bool]) -> Callable:
+    def convert(value):
+        if not check(value):
+            raise ValueError(f"expected {name}")
+        return value
+    return convert
+
+
+def _object_id(value):
+    return value if isinstance(value, ObjectId) else ObjectId(value)
+
+
+def _date(value):
+    return value if isinstance(value, datetime) else datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+PARAM_TYPES: Dict[str, Callable] = {
+    "any": lambda value: value,
+    "string": _typed("a string", lambda v: isinstance(v, str)),
+    "int": _typed("an integer", lambda v: isinstance(v, int) and not isinstance(v, bool)),
+    "number": _typed("a number", _is_number),
+    "bool": _typed("a boolean", lambda v: isinstance(v, bool)),
+    "objectId": _object_id,
+    "date": _date,
+    "array": _typed("an array", lambda v: isinstance(v, list)),
+    "object": _typed("an object", lambda v: isinstance(v, dict)),
+}
+
+
+# === COMPILATIE ===
+
+def _is_placeholder(node) -> bool:
+    return isinstance(node, dict) and len(node) == 1 and "$param" in node
+
+
+def _compile(node, used: set) -> Callable[[Dict], Any]:
+    """
+    Zet een template om in een functie params -> waarde.
+
+    Subtrees zonder $param worden een keer gebouwd en als constante gedeeld.
+    """
+    if _is_placeholder(node):
+        name = node["$param"]
+        if not isinstance(name, str):
+            raise ValueError("$param must be a parameter name")
+        used.add(name)
+        return lambda params: params[name]
+    if isinstance(node, dict):
+        parts = {key: _compile(value, used) for key, value in node.items()}
+        if all(getattr(part, "constant", False) for part in parts.values()):
+            return _constant(node)
+        return lambda params: {key: part(params) for key, part in parts.items()}
+    if isinstance(node, list):
+        parts = [_compile(value, used) for value in node]
+        if all(getattr(part, "constant", False) for part in parts):
+            return _constant(node)
+        return lambda params: [part(params) for part in parts]
+    return _constant(node)
+
+
+def _constant(value) -> Callable[[Dict], Any]:
+    def build(params):
+        return value
+    build.constant = True
+    return build
+
+
+def _validate_pipeline(pipeline) -> None:
+    if not isinstance(pipeline, list) or not pipeline:
+        raise ValueError("pipeline must be a non-empty list of stages")
+    for stage in pipeline:
+        if not isinstance(stage, dict) or len(stage) != 1 or not next(iter(stage)).startswith("$"):
+            raise ValueError(f"Invalid pipeline stage: {stage}")
+
+
+def _convert(name: str, spec: Dict[str, Any], value: Any, label: str = "Parameter") -> Any:
+    try:
+        return PARAM_TYPES[spec.get("type", "any")](value)
+    except Exception as e:
+        raise ValueError(f"{label} '{name}': {e}")
+
+
+class PreparedQuery:
+    """Een gevalideerde en gecompileerde query definitie."""
+
+    def __init__(self, handle: str, definition: Dict[str, Any]):
+        operation = definition.get("operation")
+        if operation not in QUERY_FIELDS:
+            raise ValueError(f"operation must be one of {list(QUERY_FIELDS)}")
+        for key in ("database", "collection"):
+            if not isinstance(definition.get(key), str) or not definition[key]:
+                raise ValueError(f"Prepared query needs a '{key}'")
+        if operation == "aggregate":
+            _validate_pipeline(definition.get("pipeline"))
+
+        self.handle = handle
+        self.operation = operation
+        self.database = definition["database"]
+        self.collection = definition["collection"]
+
+        used = set()
+        template = {key: definition[key] for key in QUERY_FIELDS[operation] if key in definition}
+        self._build = _compile(template, used)
+
+        declared = definition.get("params") or {}
+        unknown_types = {name: spec.get("type") for name, spec in declared.items()
+                         if spec.get("type", "any") not in PARAM_TYPES}
+        if unknown_types:
+            raise ValueError(f"Unknown parameter types: {unknown_types}")
+        self.params = {name: dict(declared.get(name) or {}) for name in used | set(declared)}
+        for name, spec in self.params.items():
+            if "default" in spec:
+                spec["default"] = _convert(name, spec, spec["default"], "Default of parameter")
+
+    def bind(self, values: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Bouw de payload voor de onderliggende action met de gebonden parameters."""
+        values = values or {}
+        unknown = set(values) - set(self.params)
+        if unknown:
+            raise ValueError(f"Unknown parameters: {sorted(unknown)}")
+
+        bound = {}
+        for name, spec in self.params.items():
+            if name in values:
+                bound[name] = _convert(name, spec, values[name])
+            elif "default" in spec:
+                bound[name] = spec["default"]
+            else:
+                raise ValueError(f"Missing parameter '{name}'")
+
+        return {"database": self.database, "collection": self.collection, **self._build(bound)}
+
+
+# === REGISTRY ===
+
+def _normalized(definition: Dict[str, Any]) -> Dict[str, Any]:
+    keys = ("operation", "database", "collection", "params") + QUERY_FIELDS.get(definition.get("operation"), ())
+    return {key: definition[key] for key in keys if key in definition}
+
+
+def compute_handle(definition: Dict[str, Any]) -> str:
+    return HANDLE_PREFIX + request_key("prepared", _normalized(definition))
+
+
+def _config_collection(client):
+    return client[os.environ.get("PREPARED_QUERIES_DATABASE", "dataapi")][PREPARED_COLLECTION]
+
+
+class PreparedQueryRegistry:
+    """Handles uit prepared_queries.json en de config collection, met LRU cache per worker."""
+
+    def __init__(self, path: Optional[str] = None, cache_size: Optional[int] = None):
+        self.path = path or os.environ.get("PREPARED_QUERIES_FILE") or DEFAULT_FILE
+        self.cache_size = cache_size or int(os.environ.get("PREPARED_QUERIES_CACHE_SIZE", 512))
+        self._named = None
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def named(self) -> Dict[str, PreparedQuery]:
+        if self._named is None:
+            named = {}
+            if os.path.exists(self.path):
+                with open(self.path, encoding="utf-8") as f:
+                    named = {name: PreparedQuery(name, definition) for name, definition in json.load(f).items()}
+            self._named = named
+        return self._named
+
+    def register(self, client, definition: Dict[str, Any]) -> PreparedQuery:
+        """Valideer en bewaar een definitie; dezelfde definitie geeft dezelfde handle."""
+        definition = _normalized(definition)
+        handle = compute_handle(definition)
+        query = PreparedQuery(handle, definition)
+        # Als BSON bytes bewaard: stages en $param zijn $-velden en types blijven behouden
+        _config_collection(client).update_one(
+            {"_id": handle}, {"$setOnInsert": {"definition": Binary(bson.encode(definition))}}, upsert=True,
+        )
+        self._remember(query)
+        return query
+
+    def get(self, client, handle: str) -> PreparedQuery:
+        named = self.named()
+        if handle in named:
+            return named[handle]
+        with self._lock:
+            if handle in self._cache:
+                self._cache.move_to_end(handle)
+                return self._cache[handle]
+        if not isinstance(handle, str) or not handle.startswith(HANDLE_PREFIX):
+            raise PreparedQueryNotFound(handle)
+        doc = _config_collection(client).find_one({"_id": handle})
+        if doc is None:
+            raise PreparedQueryNotFound(handle)
+        query = PreparedQuery(handle, bson.decode(doc["definition"]))
+        self._remember(query)
+        return query
+
+    def _remember(self, query: PreparedQuery) -> None:
+        with self._lock:
+            self._cache[query.handle] = query
+            self._cache.move_to_end(query.handle)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+
+def bind_request(registry: PreparedQueryRegistry, client, payload: Dict[str, Any]):
+    """
+    Zet een `execute` body ({"handle", "params", ...}) om naar (operation, payload).
+
+    De resulterende payload gaat door dezelfde code als een gewone action.
+    """
+    query = registry.get(client, payload.get("handle"))
+    bound = query.bind(payload.get("params"))
+    for key in PASSTHROUGH:
+        if key in payload:
+            bound[key] = payload[key]
+    return query.operation, bound
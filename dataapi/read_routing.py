@@ -0,0 +1,162 @@
+"""
+Read-preference routing voor read-only acties en custom aggregations.
+
+Volgorde (eerste die van toepassing is):
+    1. Schrijvende acties en pipelines met $out/$merge: altijd primary
+    2. `readPreference` in de request body (string of object)
+    3. De tolerantie die een BaseAggregation subclass declareert
+       (read_preference / max_staleness_seconds)
+    4. Environment defaults:
+        MONGODB_READ_PREFERENCE: mode voor reads (default "primary")
+        MONGODB_MAX_STALENESS_SECONDS: maximale replicatie achterstand (min. 90)
+        MONGODB_READ_TAGS: JSON lijst van tag sets, bijv. [{"nodeType": "ANALYTICS"}]
+        MONGODB_HEDGED_READS: "true" om hedged reads aan te zetten
+
+readPreference in de request body:
+    "secondaryPreferred"
+    {"mode": "secondary", "maxStalenessSeconds": 120, "tags": [{"region": "EU"}],
+     "hedge": true, "analytics": true}
+
+`analytics: true` stuurt naar Atlas analytics nodes (tag nodeType=ANALYTICS).
+Hedged reads zijn deprecated vanaf MongoDB 8.0 en worden daar genegeerd.
+
+De gekozen route komt in de X-Read-Preference response header en in de logs.
+"""
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional
+from pymongo.read_preferences import (
+    Primary,
+    PrimaryPreferred,
+    Secondary,
+    SecondaryPreferred,
+    Nearest,
+)
+
+READ_OPERATIONS = ("findOne", "find", "aggregate", "count")
+WRITE_STAGES = ("$out", "$merge")
+MIN_MAX_STALENESS_SECONDS = 90
+ANALYTICS_TAGS = [{"nodeType": "ANALYTICS"}]
+
+_MODES = {
+    "primary": Primary,
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
+
+
+class ReadRoute:
+    """Routing beslissing voor een enkele read."""
+
+    def __init__(self, mode: str = "primary", max_staleness: Optional[int] = None,
+                 tags: Optional[List[Dict]] = None, hedge: bool = False, source: str = "default"):
+        if mode not in _MODES:
+            raise ValueError(f"Unknown read preference '{mode}'. Available: {list(_MODES)}")
+        if mode == "primary" and (max_staleness or tags or hedge):
+            raise ValueError("maxStalenessSeconds, tags and hedge require a non-primary read preference")
+        if max_staleness is not None and int(max_staleness) < MIN_MAX_STALENESS_SECONDS:
+            raise ValueError(f"maxStalenessSeconds must be at least {MIN_MAX_STALENESS_SECONDS}")
+        self.mode = mode
+        self.max_staleness = int(max_staleness) if max_staleness is not None else None
+        self.tags = tags or []
+        self.hedge = bool(hedge)
+        self.source = source
+
+    def read_preference(self):
+        """pymongo ReadPreference voor Collection.with_options()."""
+        if self.mode == "primary":
+            return Primary()
+        kwargs = {"tag_sets": self.tags or None, "max_staleness": self.max_staleness or -1}
+        if self.hedge:
+            kwargs["hedge"] = {"enabled": True}
+        return _MODES[self.mode](**kwargs)
+
+    def header(self) -> str:
+        """Waarde voor de X-Read-Preference response header."""
+        parts = [self.mode]
+        if self.max_staleness:
+            parts.append(f"maxStalenessSeconds={self.max_staleness}")
+        if self.tags:
+            parts.append(f"tags={json.dumps(self.tags, separators=(',', ':'))}")
+        if self.hedge:
+            parts.append("hedge=true")
+        parts.append(f"source={self.source}")
+        return "; ".join(parts)
+
+    def headers(self) -> Dict[str, str]:
+        return {"X-Read-Preference": self.header()}
+
+    def log(self, operation: str) -> None:
+        logging.info(
+            f"read_routing operation={operation} mode={self.mode} "
+            f"maxStalenessSeconds={self.max_staleness} tags={self.tags} hedge={self.hedge} source={self.source}"
+        )
+
+
+def _parse(spec: Any, source: str) -> ReadRoute:
+    """Zet een readPreference uit de request body om naar een ReadRoute."""
+    if isinstance(spec, str):
+        return ReadRoute(spec, source=source)
+    if not isinstance(spec, dict):
+        raise ValueError("readPreference must be a mode name or an object with a 'mode'")
+    tags = list(spec.get("tags") or [])
+    mode = spec.get("mode")
+    if spec.get("analytics"):
+        tags = ANALYTICS_TAGS + tags
+        mode = mode or "secondary"
+    return ReadRoute(
+        mode or "secondaryPreferred",
+        max_staleness=spec.get("maxStalenessSeconds"),
+        tags=tags,
+        hedge=spec.get("hedge", False),
+        source=source,
+    )
+
+
+def default_route() -> ReadRoute:
+    """Route uit de environment defaults."""
+    mode = os.environ.get("MONGODB_READ_PREFERENCE") or "primary"
+    if mode == "primary":
+        return ReadRoute()
+    max_staleness = os.environ.get("MONGODB_MAX_STALENESS_SECONDS")
+    tags = os.environ.get("MONGODB_READ_TAGS")
+    return ReadRoute(
+        mode,
+        max_staleness=int(max_staleness) if max_staleness else None,
+        tags=json.loads(tags) if tags else None,
+        hedge=os.environ.get("MONGODB_HEDGED_READS", "").lower() == "true",
+    )
+
+
+def route_operation(operation: str, payload: Dict[str, Any]) -> ReadRoute:
+    """Route voor een Data API actie."""
+    if operation not in READ_OPERATIONS:
+        return ReadRoute(source="write")
+    if operation == "aggregate":
+        stages = payload.get("pipeline") or []
+        if any(isinstance(stage, dict) and any(k in stage for k in WRITE_STAGES) for stage in stages):
+            return ReadRoute(source="write")
+    if payload.get("readPreference") is not None:
+        return _parse(payload["readPreference"], "request")
+    return default_route()
+
+
+def route_aggregation(aggregation, params: Dict[str, Any]) -> ReadRoute:
+    """Route voor een custom aggregation, rekening houdend met zijn stale tolerantie."""
+    if params.get("readPreference") is not None:
+        return _parse(params["readPreference"], "request")
+    if aggregation.read_preference == "primary":
+        return ReadRoute(source="aggregation")
+    if aggregation.read_preference or aggregation.max_staleness_seconds:
+        env = default_route()
+        return ReadRoute(
+            aggregation.read_preference or "secondaryPreferred",
+            max_staleness=aggregation.max_staleness_seconds,
+            tags=env.tags,
+            hedge=env.hedge,
+            source="aggregation",
+        )
+    return default_route()
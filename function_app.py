@@ -3,13 +3,35 @@ import logging
 import json
 import traceback
 import os
-from pymongo import MongoClient
+import threading
+from pymongo import MongoClient, ReadPreference
 from bson import ObjectId
 from datetime import datetime
-from aggregations import AGGREGATIONS
+from aggregations import AGGREGATIONS, TaskDashboardSync
+from dataapi.changes import read_changes
+from dataapi.counts import count_documents
+from dataapi.read_routing import READ_OPERATIONS, default_route, route_operation, route_aggregation
+from dataapi.capture import capture_traffic
+from dataapi.circuit_breaker import (
+    CircuitBreaker, CircuitOpenError, call_with_breaker, is_connection_error, ping_probe,
+    request_deadline,
+)
+from dataapi.prepared import PreparedQueryRegistry, PreparedQueryNotFound, bind_request
+from dataapi.parallel_scan import parallel_aggregate, parse_options as parallel_options
+from dataapi.etags import (
+    WRITE_OPERATIONS, bump_version, etag_matches, request_key, result_etag, version_etag,
+    versioned_write, write_targets,
+)
+from dataapi.formats import (
+    JSON, BSON, RAW_CODEC_OPTIONS, UnsupportedFormatError,
+    request_format, response_format, decode_body, encode_body, with_id,
+)
 
 app = func.FunctionApp(http_auth_level=func.AuthLevel.FUNCTION)
 
+# Prepared queries, validated and compiled once per worker
+PREPARED_QUERIES = PreparedQueryRegistry()
+
 def connect_to_mongodb():
     conn_str = os.environ.get("MONGODBATLAS_CLUSTER_CONNECTIONSTRING")
     if not conn_str:
@@ -21,21 +43,70 @@ def connect_to_mongodb():
         logging.error(f"Error connecting to MongoDB: {e}")
         raise
 
-
-def success_response(body):
+# One MongoClient per worker: pymongo pools connections and is thread-safe,
+# so requests (and parallel scan threads) share it instead of reconnecting
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = connect_to_mongodb()
+    return _client
+
+# Circuit breakers per operation class, probing a node that can serve that class
+BREAKERS = {
+    # Probe the members that reads without an explicit readPreference go to (primary by default)
+    "read": CircuitBreaker("read", ping_probe(get_client, default_route().read_preference())),
+    "write": CircuitBreaker("write", ping_probe(get_client, ReadPreference.PRIMARY)),
+}
+
+
+def success_response(body, fmt=JSON, headers=None):
+    if fmt != JSON:
+        return func.HttpResponse(encode_body(body, fmt), status_code=200, headers=headers, mimetype=fmt)
     return func.HttpResponse(
         json.dumps(body, cls=DateTimeEncoder),
         status_code=200,
+        headers=headers,
         mimetype="application/json"
     )
 
-def error_response(err):
+def not_modified_response(etag, headers=None):
+    return func.HttpResponse(status_code=304, headers={**(headers or {}), "ETag": etag})
+
+def error_response(err, status_code=400, headers=None):
     error_message = str(err)
     return func.HttpResponse(
         error_message,
-        status_code=400,
+        status_code=status_code,
+        headers=headers,
         mimetype="application/json"
     )
+
+# 503 while the cluster is unreachable, so clients back off instead of piling up
+def unavailable_response(err):
+    if isinstance(err, CircuitOpenError):
+        return error_response(err, 503, {"Retry-After": str(err.retry_after)})
+    return error_response(f"MongoDB unavailable: {err}", 503)
+
+# Parse the request body according to its Content-Type (JSON, BSON or MessagePack)
+def parse_payload(req, fmt, raw=False):
+    if fmt == JSON:
+        return req.get_json()
+    return decode_body(req.get_body(), fmt, raw)
+
+# Collection for reads; with a BSON response documents stay raw BSON end to end
+def read_collection(client, db, coll, raw, read_preference=None):
+    if raw or read_preference is not None:
+        return client[db][coll].with_options(
+            codec_options=RAW_CODEC_OPTIONS if raw else None,
+            read_preference=read_preference,
+        )
+    return client[db][coll]
+
 # Used to convert datetime object(s) to string
 class DateTimeEncoder(json.JSONEncoder):
     def default(self, o):
@@ -43,114 +114,210 @@ class DateTimeEncoder(json.JSONEncoder):
             return o.isoformat()
         return super().default(o)
     
+# Runs one Data API action; returns the result body, or an error response for invalid input.
+# Body checks run before execute_action, so a rejected write never opens a transaction or bumps a version
+def validate_action(op, payload):
+    if op == "insertOne" and ("document" not in payload or payload['document'] == {}):
+        return "Send a document to insert"
+    if op == "insertMany" and ("documents" not in payload or payload['documents'] == {}):
+        return "Send a document to insert"
+    if op == "aggregate" and ("pipeline" not in payload or payload['pipeline'] == []):
+        return "Send a pipeline"
+    return None
+
+# Writes use the given session, so versioned collections can bump their counter in the same transaction
+def execute_action(client, op, payload, raw, read_pref, session=None):
+    db,coll =  payload.get('database'),payload.get('collection')
+
+    if op == "findOne":
+        filter_op = payload['filter'] if 'filter' in payload else {}
+        projection = payload['projection'] if 'projection' in payload else {}
+        result = {"document": read_collection(client, db, coll, raw, read_pref).find_one(filter_op, projection)}
+        # print("*************")
+        # print(result)
+        # print("*************")
+        if result['document'] is not None and not raw:
+            if '_id' in result['document'] and isinstance(result['document']['_id'], ObjectId):
+                result['document']['_id'] = str(result['document']['_id'])
+    elif op == "find":
+        agg_query = []
+
+        if 'filter' in payload and payload['filter'] != {}:
+            agg_query.append({"$match": payload['filter']})
+
+        if "sort" in payload and payload['sort'] != {}:
+            agg_query.append({"$sort": payload['sort']})
+
+        if "skip" in payload:
+            agg_query.append({"$skip": payload['skip']})
+
+        if 'limit' in payload:
+            agg_query.append({"$limit": payload['limit']})
+
+        if "projection" in payload and payload['projection'] != {}:
+            agg_query.append({"$project": payload['projection']})
+
+        parallel = parallel_options(payload.get('parallel'))
+        if parallel:
+            # Range cursors run concurrently; merged documents are dicts, even for BSON responses
+            result = {"documents": parallel_aggregate(read_collection(client, db, coll, False, read_pref), agg_query, **parallel)}
+        else:
+            result = {"documents": list(read_collection(client, db, coll, raw, read_pref).aggregate(agg_query))}
+        for obj in ([] if raw else result['documents']):
+            if '_id' in obj and isinstance(obj['_id'], ObjectId):
+                obj['_id'] = str(obj['_id'])
+
+    elif op == "insertOne":
+        insert_op = client[db][coll].insert_one(with_id(payload['document']), session=session)
+        result = {"insertedId": str(insert_op.inserted_id)}
+
+    elif op == "insertMany":
+        documents = [with_id(doc) for doc in payload['documents']]
+        client[db][coll].insert_many(documents, session=session)
+        result = {"insertedIds": [str(doc['_id']) for doc in documents]}
+
+    elif op in ["updateOne", "updateMany"]:
+        payload['upsert'] = payload['upsert'] if 'upsert' in payload else False
+        if "_id" in payload['filter']:
+            payload['filter']['_id'] = ObjectId(payload['filter']['_id'])
+        if op == "/updateOne":
+            update_op = client[db][coll].update_one(payload['filter'], payload['update'], upsert=payload['upsert'], session=session)
+        else:
+            update_op = client[db][coll].update_many(payload['filter'], payload['update'], upsert=payload['upsert'], session=session)
+        result = {"matchedCount": update_op.matched_count, "modifiedCount": update_op.modified_count}
+
+    elif op in ["deleteOne", "deleteMany"]:
+        payload['filter'] = payload['filter'] if 'filter' in payload else {}
+        if "_id" in payload['filter']:
+            payload['filter']['_id'] = ObjectId(payload['filter']['_id'])
+        if op == "/deleteOne":
+            result = {"deletedCount": client[db][coll].delete_one(payload['filter'], session=session).deleted_count}
+        else:
+            result = {"deletedCount": client[db][coll].delete_many(payload['filter'], session=session).deleted_count}
+
+    elif op == "aggregate":
+        parallel = parallel_options(payload.get('parallel'))
+        if parallel:
+            docs = parallel_aggregate(read_collection(client, db, coll, False, read_pref), payload['pipeline'], **parallel)
+        else:
+            docs = list(read_collection(client, db, coll, raw, read_pref).aggregate(payload['pipeline']))
+        for obj in ([] if raw else docs):
+            if '_id' in obj and isinstance(obj['_id'], ObjectId):
+                obj['_id'] = str(obj['_id'])
+        result = {"documents": docs}
+
+    elif op == "count":
+        filter_op = payload['filter'] if 'filter' in payload else {}
+        result = count_documents(read_collection(client, db, coll, False, read_pref), filter_op, payload.get('groupBy'))
+
+    elif op == "changes":
+        result = read_changes(
+            client[db][coll],
+            resume_token=payload.get('resumeToken'),
+            batch_size=payload.get('batchSize'),
+            max_await_ms=payload.get('maxAwaitTimeMS'),
+        )
+
+    elif op == "prepare":
+        query = PREPARED_QUERIES.register(client, payload)
+        result = {"handle": query.handle, "operation": query.operation, "params": sorted(query.params)}
+
+    else:
+        return error_response("Not a valid operation")
+
+    return result
+
 @app.route(route="mdb_dataapi/action/{operation}",methods=['POST'])
+@capture_traffic("action", "operation")
 def mongodb_dataapi_replace(req: func.HttpRequest) -> func.HttpResponse:
     logging.info('Python HTTP trigger function processed a request.')
 
-    client = None
-
     try:
-        payload = req.get_json()
-        client = connect_to_mongodb()
+        in_fmt, out_fmt = request_format(req.headers), response_format(req.headers)
+        raw = out_fmt == BSON
         op = req.route_params.get('operation')
+        # BSON documents to insert are passed to the driver as raw bytes
+        payload = parse_payload(req, in_fmt, raw=op in ("insertOne", "insertMany"))
+        client = get_client()
+        # One deadline for the whole request, also when binding a prepared query first
+        deadline = request_deadline()
+        if op == "execute":
+            # Prepared query: handle + params become the payload of the underlying action
+            op, payload = call_with_breaker(
+                BREAKERS["read"], lambda: bind_request(PREPARED_QUERIES, client, payload),
+                retry=True, deadline=deadline,
+            )
+        # Reads may go to secondaries/analytics nodes, writes always to the primary
+        route = route_operation(op, payload)
+        route.log(op)
+        read_pref = route.read_preference()
         # logging.info(op)
         db,coll =  payload.get('database'),payload.get('collection')
         # logging.info(db)
         # logging.info(coll)  
-        if op == "findOne":
-            filter_op = payload['filter'] if 'filter' in payload else {}
-            projection = payload['projection'] if 'projection' in payload else {}
-            result = {"document": client[db][coll].find_one(filter_op, projection)}
-            # print("*************")
-            # print(result)
-            # print("*************")
-            if result['document'] is not None:
-                if '_id' in result['document'] and isinstance(result['document']['_id'], ObjectId):
-                    result['document']['_id'] = str(result['document']['_id'])
-        elif op == "find":
-            agg_query = []
-
-            if 'filter' in payload and payload['filter'] != {}:
-                agg_query.append({"$match": payload['filter']})
-
-            if "sort" in payload and payload['sort'] != {}:
-                agg_query.append({"$sort": payload['sort']})
-
-            if "skip" in payload:
-                agg_query.append({"$skip": payload['skip']})
-
-            if 'limit' in payload:
-                agg_query.append({"$limit": payload['limit']})
-
-            if "projection" in payload and payload['projection'] != {}:
-                agg_query.append({"$project": payload['projection']})
-
-            result = {"documents": list(client[db][coll].aggregate(agg_query))}
-            for obj in result['documents']:
-                if '_id' in obj and isinstance(obj['_id'], ObjectId):
-                    obj['_id'] = str(obj['_id'])
-
-        elif op == "insertOne":
-            if "document" not in payload or payload['document'] == {}:
-                return error_response("Send a document to insert")
-            insert_op = client[db][coll].insert_one(payload['document'])
-            result = {"insertedId": str(insert_op.inserted_id)}
-
-        elif op == "insertMany":
-            if "documents" not in payload or payload['documents'] == {}:
-                return error_response("Send a document to insert")
-            insert_op = client[db][coll].insert_many(payload['documents'])
-            result = {"insertedIds": [str(_id) for _id in insert_op.inserted_ids]}
-
-        elif op in ["updateOne", "updateMany"]:
-            payload['upsert'] = payload['upsert'] if 'upsert' in payload else False
-            if "_id" in payload['filter']:
-                payload['filter']['_id'] = ObjectId(payload['filter']['_id'])
-            if op == "/updateOne":
-                update_op = client[db][coll].update_one(payload['filter'], payload['update'], upsert=payload['upsert'])
-            else:
-                update_op = client[db][coll].update_many(payload['filter'], payload['update'], upsert=payload['upsert'])
-            result = {"matchedCount": update_op.matched_count, "modifiedCount": update_op.modified_count}
-
-        elif op in ["deleteOne", "deleteMany"]:
-            payload['filter'] = payload['filter'] if 'filter' in payload else {}
-            if "_id" in payload['filter']:
-                payload['filter']['_id'] = ObjectId(payload['filter']['_id'])
-            if op == "/deleteOne":
-                result = {"deletedCount": client[db][coll].delete_one(payload['filter']).deleted_count}
-            else:
-                result = {"deletedCount": client[db][coll].delete_many(payload['filter']).deleted_count}
-
-        elif op == "aggregate":
-            if "pipeline" not in payload or payload['pipeline'] == []:
-                return error_response("Send a pipeline")
-            docs = list(client[db][coll].aggregate(payload['pipeline']))
-            for obj in docs:
-                if '_id' in obj and isinstance(obj['_id'], ObjectId):
-                    obj['_id'] = str(obj['_id'])
-            result = {"documents": docs}
 
-        else:
-            return error_response("Not a valid operation")
-
-        return success_response(result)
+        # Connection errors count per operation class; idempotent reads and change batches are retried
+        is_read = route.source != "write" or op == "changes"
+        breaker = BREAKERS["read" if is_read else "write"]
+
+        # Conditional reads: with a version counter a matching ETag skips the query entirely
+        cacheable = op in READ_OPERATIONS and route.source != "write"
+        if_none_match = req.headers.get('If-None-Match')
+
+        invalid = validate_action(op, payload)
+        if invalid:
+            return error_response(invalid)
+
+        def attempt():
+            etag = None
+            if cacheable and route.mode == "primary":
+                etag = version_etag(client, db, [coll], request_key("action", op, db, coll, payload, out_fmt))
+                if etag_matches(if_none_match, etag):
+                    return etag, None
+            # Versioned collections: the counter moves with the write (transaction for DML)
+            result = versioned_write(
+                client, write_targets(op, db, coll, payload),
+                lambda session: execute_action(client, op, payload, raw, read_pref, session),
+                transactional=op in WRITE_OPERATIONS,
+            )
+            return etag, result
+
+        etag, result = call_with_breaker(breaker, attempt, retry=is_read, deadline=deadline)
+        if result is None:
+            return not_modified_response(etag, route.headers())
+        if isinstance(result, func.HttpResponse):
+            return result
+
+        headers = route.headers()
+        if cacheable:
+            etag = etag or result_etag(result, out_fmt)
+            if etag_matches(if_none_match, etag):
+                return not_modified_response(etag, headers)
+            headers["ETag"] = etag
+        return success_response(result, out_fmt, headers)
+
+    except UnsupportedFormatError as e:
+        return error_response(e, 415)
+
+    except PreparedQueryNotFound as e:
+        return error_response(e, 404)
+
+    except CircuitOpenError as e:
+        return unavailable_response(e)
 
     except Exception as e:
         print(traceback.format_exc())
+        if is_connection_error(e):
+            return unavailable_response(e)
         return error_response(e)
 
-    finally:
-        if client:
-            client.close()
-
 
 @app.route(route="mdb_dataapi/custom/{aggregation_name}", methods=['POST'])
+@capture_traffic("custom", "aggregation_name")
 def mongodb_custom_aggregation(req: func.HttpRequest) -> func.HttpResponse:
     """Endpoint voor custom named aggregations."""
     logging.info('Custom aggregation request received.')
 
-    client = None
-
     try:
         aggregation_name = req.route_params.get('aggregation_name')
 
@@ -158,28 +325,75 @@ def mongodb_custom_aggregation(req: func.HttpRequest) -> func.HttpResponse:
         if aggregation_name not in AGGREGATIONS:
             return error_response(f"Aggregation '{aggregation_name}' not found. Available: {list(AGGREGATIONS.keys())}")
 
-        # Parse parameters uit request body
+        # Parse parameters uit request body (JSON, BSON of MessagePack)
+        in_fmt, out_fmt = request_format(req.headers), response_format(req.headers)
         try:
-            params = req.get_json() or {}
+            params = parse_payload(req, in_fmt) or {}
         except ValueError:
             params = {}
 
         # Instantieer en execute aggregation
-        client = connect_to_mongodb()
+        client = get_client()
         aggregation = AGGREGATIONS[aggregation_name]()
-        documents = aggregation.execute(client, params)
-
-        # Convert ObjectIds naar strings
-        for doc in documents:
+        route = route_aggregation(aggregation, params)
+        route.log(aggregation_name)
+
+        # Conditional request: versie ETag over alle bron collections, anders hash van het resultaat
+        if_none_match = req.headers.get('If-None-Match')
+
+        def attempt():
+            etag = None
+            if route.mode == "primary":
+                etag = version_etag(
+                    client, aggregation.database, aggregation.source_collections or [aggregation.collection],
+                    request_key("custom", aggregation_name, params, out_fmt),
+                )
+                if etag_matches(if_none_match, etag):
+                    return etag, None
+            return etag, aggregation.execute(client, params, route.read_preference())
+
+        # Custom aggregations zijn reads: via de read breaker, met retries binnen de deadline
+        etag, documents = call_with_breaker(BREAKERS["read"], attempt, retry=True)
+        if documents is None:
+            return not_modified_response(etag, route.headers())
+
+        # Convert ObjectIds naar strings (BSON behoudt de echte types)
+        for doc in ([] if out_fmt == BSON else documents):
             if '_id' in doc and isinstance(doc['_id'], ObjectId):
                 doc['_id'] = str(doc['_id'])
 
-        return success_response({"documents": documents})
+        result = {"documents": documents}
+        etag = etag or result_etag(result, out_fmt)
+        headers = {**route.headers(), "ETag": etag}
+        if etag_matches(if_none_match, etag):
+            return not_modified_response(etag, headers)
+        return success_response(result, out_fmt, headers)
+
+    except UnsupportedFormatError as e:
+        return error_response(e, 415)
+
+    except CircuitOpenError as e:
+        return unavailable_response(e)
 
     except Exception as e:
         logging.error(f"Custom aggregation error: {traceback.format_exc()}")
+        if is_connection_error(e):
+            return unavailable_response(e)
         return error_response(e)
 
-    finally:
-        if client:
-            client.close()
+
+@app.timer_trigger(schedule="0 */5 * * * *", arg_name="timer", run_on_startup=False, use_monitor=True)
+def task_dashboard_reconciliation(timer: func.TimerRequest) -> None:
+    """Houdt de TaskDashboard samenvattingen bij (incrementeel, periodiek volledig)."""
+    logging.info('Task dashboard reconciliation started.')
+
+    try:
+        client = get_client()
+        stats = TaskDashboardSync().sync(client)
+        if stats["mode"] == "full" or any(stats["keys"].values()):
+            bump_version(client, TaskDashboardSync.database, TaskDashboardSync.collection)
+        logging.info(f"Task dashboard reconciliation done: {stats}")
+
+    except Exception:
+        logging.error(f"Task dashboard reconciliation error: {traceback.format_exc()}")
+        raise
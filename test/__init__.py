@@ -0,0 +1 @@
+# Tests (pytest); zie .funcignore: niet mee gedeployed
@@ -0,0 +1,202 @@
+"""
+Tests voor de toestanden van de circuit breaker en de retries van call_with_breaker.
+
+Klok, probe en sleep worden geïnjecteerd: er is geen MongoDB nodig.
+"""
+import pytest
+from pymongo.errors import AutoReconnect, OperationFailure
+from dataapi import circuit_breaker
+from dataapi.circuit_breaker import (
+    CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError, call_with_breaker,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture(autouse=True)
+def settings(monkeypatch):
+    for name, value in {
+        "CIRCUIT_FAILURE_RATE": "0.5",
+        "CIRCUIT_MIN_REQUESTS": "4",
+        "CIRCUIT_WINDOW_SECONDS": "30",
+        "CIRCUIT_OPEN_SECONDS": "10",
+        "CIRCUIT_HALF_OPEN_REQUESTS": "2",
+        "RETRY_BASE_DELAY_SECONDS": "0.1",
+        "RETRY_MAX_DELAY_SECONDS": "1",
+    }.items():
+        monkeypatch.setenv(name, value)
+
+
+def _breaker(clock, probe=lambda: None) -> CircuitBreaker:
+    return CircuitBreaker("test", probe, clock=clock)
+
+
+def _open(breaker: CircuitBreaker) -> None:
+    for _ in range(breaker.min_requests):
+        breaker.record(False, breaker.before())
+    assert breaker.state == OPEN
+
+
+def _fail():
+    raise AutoReconnect("connection refused")
+
+
+def _bad_query():
+    raise OperationFailure("unknown operator: $foo", 2)
+
+
+def test_opens_at_failure_threshold(clock):
+    breaker = _breaker(clock)
+    for ok in (True, True, False):
+        breaker.record(ok, breaker.before())
+    assert breaker.state == CLOSED
+    breaker.record(False, breaker.before())
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before()
+
+
+def test_old_failures_leave_the_window(clock):
+    breaker = _breaker(clock)
+    for _ in range(3):
+        breaker.record(False, breaker.before())
+    clock.now += 31
+    breaker.record(False, breaker.before())
+    assert breaker.state == CLOSED
+
+
+def test_failed_probe_keeps_breaker_open(clock):
+    probes = []
+
+    def probe():
+        probes.append(clock.now)
+        raise AutoReconnect("still down")
+
+    breaker = _breaker(clock, probe)
+    _open(breaker)
+    with pytest.raises(CircuitOpenError):
+        breaker.before()
+    assert probes == []
+
+    clock.now += 10
+    with pytest.raises(CircuitOpenError) as raised:
+        breaker.before()
+    assert probes == [clock.now]
+    assert breaker.state == OPEN
+    assert raised.value.retry_after == 10
+    # Het open venster start opnieuw na de mislukte probe
+    clock.now += 5
+    with pytest.raises(CircuitOpenError):
+        breaker.before()
+    assert len(probes) == 1
+
+
+def test_half_open_closes_after_successful_trials(clock):
+    breaker = _breaker(clock)
+    _open(breaker)
+    clock.now += 10
+    probing = breaker.before()
+    assert breaker.state == HALF_OPEN
+    trial = breaker.before()
+    # Meer proef requests dan CIRCUIT_HALF_OPEN_REQUESTS worden geweigerd
+    with pytest.raises(CircuitOpenError):
+        breaker.before()
+    breaker.record(True, probing)
+    assert breaker.state == HALF_OPEN
+    breaker.record(True, trial)
+    assert breaker.state == CLOSED
+
+
+def test_half_open_reopens_on_failed_trial(clock):
+    breaker = _breaker(clock)
+    _open(breaker)
+    clock.now += 10
+    breaker.record(False, breaker.before())
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before()
+
+
+def test_outcome_from_an_older_state_is_ignored(clock):
+    breaker = _breaker(clock)
+    # Toegelaten terwijl de breaker nog closed was, hangt in server selection
+    slow = breaker.before()
+    _open(breaker)
+    clock.now += 10
+    trial = breaker.before()
+    assert breaker.state == HALF_OPEN
+
+    breaker.record(False, slow)
+    assert breaker.state == HALF_OPEN
+    breaker.record(True, slow)
+    breaker.record(True, trial)
+    assert breaker.state == HALF_OPEN
+    breaker.record(True, breaker.before())
+    assert breaker.state == CLOSED
+
+
+def test_query_errors_do_not_count(clock):
+    breaker = _breaker(clock)
+    for _ in range(breaker.min_requests):
+        with pytest.raises(OperationFailure):
+            call_with_breaker(breaker, _bad_query, retry=True, sleep=clock.sleep)
+    assert breaker.state == CLOSED
+
+
+def test_retries_until_success(clock, monkeypatch):
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", clock)
+    breaker = _breaker(clock)
+    calls = []
+
+    def flaky():
+        calls.append(clock.now)
+        if len(calls) < 3:
+            _fail()
+        return "ok"
+
+    assert call_with_breaker(breaker, flaky, retry=True, sleep=clock.sleep, deadline=clock.now + 60) == "ok"
+    assert len(calls) == 3
+
+
+def test_retries_stop_at_deadline(clock, monkeypatch):
+    monkeypatch.setenv("CIRCUIT_MIN_REQUESTS", "1000")
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", clock)
+    breaker = _breaker(clock)
+    calls = []
+
+    def down():
+        calls.append(clock.now)
+        _fail()
+
+    deadline = clock.now + 5
+    with pytest.raises(AutoReconnect):
+        call_with_breaker(breaker, down, retry=True, sleep=clock.sleep, deadline=deadline)
+    assert len(calls) > 1
+    assert clock.now < deadline
+
+
+def test_writes_are_not_retried(clock):
+    breaker = _breaker(clock)
+    calls = []
+
+    def down():
+        calls.append(clock.now)
+        _fail()
+
+    with pytest.raises(AutoReconnect):
+        call_with_breaker(breaker, down, sleep=clock.sleep)
+    assert len(calls) == 1
@@ -0,0 +1,170 @@
+"""
+Tests voor de parallelle split-scan: pipeline splitsen, ranges, BSON volgorde
+en de merge met globale $skip/$limit.
+
+Ranges en merge draaien tegen mongomock, dat voor $gte/$lt dezelfde type
+bracketing toepast als MongoDB ($bucketAuto kent het niet, enkel "sample"
+wordt getest). De verwachte BSON volgorde volgt
+https://www.mongodb.com/docs/manual/reference/bson-type-comparison-order/.
+"""
+import functools
+import random
+from datetime import datetime
+import mongomock
+import pytest
+from bson import Binary, Decimal128, ObjectId, Regex, Timestamp
+from bson.max_key import MaxKey
+from bson.min_key import MinKey
+from dataapi.parallel_scan import (
+    SORT_KEY_FIELD, _comparator, _compare_values, _dominant_type, _split_pipeline,
+    parallel_aggregate, range_filters, split_points,
+)
+
+
+@pytest.fixture
+def collection():
+    return mongomock.MongoClient().db.items
+
+
+# === PIPELINE SPLITSEN ===
+
+def test_split_find_pipeline():
+    pipeline = [
+        {"$match": {"Status": 1}},
+        {"$sort": {"DueDate": 1}},
+        {"$skip": 10},
+        {"$limit": 5},
+        {"$project": {"Title": 1}},
+    ]
+    assert _split_pipeline(pipeline) == (
+        [{"$match": {"Status": 1}}], {"DueDate": 1}, 10, 5, [{"$project": {"Title": 1}}],
+    )
+
+
+def test_split_streaming_pipeline():
+    pipeline = [{"$match": {}}, {"$unwind": "$Notes"}, {"$lookup": {"from": "Projects", "as": "p"}}]
+    assert _split_pipeline(pipeline) == (pipeline, None, 0, None, [])
+
+
+@pytest.mark.parametrize("pipeline", [
+    [{"$group": {"_id": "$Team"}}],
+    [{"$limit": 5}, {"$sort": {"a": 1}}],
+    [{"$sort": {"a": 1}}, {"$sort": {"b": 1}}],
+    [{"$sort": {"a": 1}}, {"$match": {}}],
+    [{"$project": {"a": 1}, "$match": {}}],
+], ids=["group", "sort after limit", "two sorts", "match after sort", "two stages in one"])
+def test_split_rejects(pipeline):
+    with pytest.raises(ValueError):
+        _split_pipeline(pipeline)
+
+
+# === RANGES ===
+
+MIXED_KEYS = (
+    [{"_id": i, "k": i} for i in range(60)]
+    + [{"_id": 100 + i, "k": i + 0.5} for i in range(20)]
+    + [{"_id": 200 + i, "k": f"s{i:02d}"} for i in range(30)]
+    + [{"_id": 300 + i, "k": datetime(2024, 1, 1 + i)} for i in range(5)]
+    + [{"_id": 400, "k": None}, {"_id": 401}, {"_id": 402, "k": ObjectId("65b000000000000000000001")}]
+)
+
+
+def _assert_partition(collection, filters):
+    seen = [doc["_id"] for f in filters for doc in collection.find(f)]
+    assert sorted(seen) == sorted(doc["_id"] for doc in collection.find())
+
+
+def test_no_points_is_one_range():
+    assert range_filters([]) == [{}]
+
+
+def test_dominant_type_keeps_one_type():
+    values = [1, "a", 2.5, None, "b", 3, [1], {"a": 1}, Decimal128("4")]
+    assert _dominant_type(values) == [1, 2.5, 3, Decimal128("4")]
+    assert _dominant_type([None, None, {"a": 1}]) == []
+
+
+@pytest.mark.parametrize("points", [
+    [10, 20.5, 40],
+    ["s05", "s20"],
+    [datetime(2024, 1, 3)],
+], ids=["numbers", "strings", "dates"])
+def test_ranges_disjoint_and_complete(collection, points):
+    collection.insert_many(MIXED_KEYS)
+    _assert_partition(collection, range_filters(points, "k"))
+
+
+def test_split_points_with_mixed_types(collection):
+    collection.insert_many(MIXED_KEYS)
+    random.seed(3)
+    points = split_points(collection, 6, "k")
+    # Getallen komen het meest voor: enkel numerieke grenzen
+    assert points and all(isinstance(point, (int, float)) for point in points)
+    assert points == sorted(points)
+    _assert_partition(collection, range_filters(points, "k"))
+
+
+# === BSON VOLGORDE ===
+
+BSON_ORDER = [
+    MinKey(),
+    None,
+    -1, 2.5, Decimal128("3"), 4,
+    "a", "b",
+    {"a": 1},
+    [1],
+    Binary(b"\x01"),
+    ObjectId("65b000000000000000000001"), ObjectId("65b000000000000000000002"),
+    False, True,
+    datetime(2024, 1, 1), datetime(2024, 6, 1),
+    Timestamp(1, 1),
+    Regex("^a"),
+    MaxKey(),
+]
+
+
+def test_compare_values_follows_bson_order():
+    values = list(BSON_ORDER)
+    random.Random(5).shuffle(values)
+    assert sorted(values, key=functools.cmp_to_key(_compare_values)) == BSON_ORDER
+
+
+def test_comparator_directions_and_missing_fields():
+    docs = [
+        {"id": 1, SORT_KEY_FIELD: {"0": "b", "1": 2}},
+        {"id": 2, SORT_KEY_FIELD: {"0": "b", "1": 1}},
+        {"id": 3, SORT_KEY_FIELD: {"1": 5}},
+        {"id": 4, SORT_KEY_FIELD: {"0": "a", "1": 1}},
+    ]
+    ordered = sorted(docs, key=functools.cmp_to_key(_comparator([-1, 1])))
+    # Aflopend op veld 0 (ontbrekend = null, laagste), daarna oplopend op veld 1
+    assert [doc["id"] for doc in ordered] == [2, 1, 4, 3]
+
+
+# === MERGE ===
+
+def _seed(collection, n=200):
+    rng = random.Random(11)
+    collection.insert_many([
+        {"_id": i, "v": rng.randint(0, 40), "team": rng.choice(["A", "B", "C"])} for i in range(n)
+    ])
+
+
+@pytest.mark.parametrize("skip, limit", [(0, 20), (7, 20), (100, 50), (0, None)])
+def test_parallel_sort_skip_limit_matches_single_cursor(collection, skip, limit):
+    _seed(collection)
+    pipeline = [{"$match": {"team": {"$ne": "C"}}}, {"$sort": {"v": -1, "_id": 1}}]
+    if skip:
+        pipeline.append({"$skip": skip})
+    if limit is not None:
+        pipeline.append({"$limit": limit})
+    pipeline.append({"$project": {"v": 1}})
+
+    expected = list(collection.aggregate(pipeline))
+    assert parallel_aggregate(collection, pipeline, partitions=4) == expected
+
+
+def test_parallel_without_sort_reads_everything_once(collection):
+    _seed(collection)
+    documents = parallel_aggregate(collection, [{"$match": {"team": "A"}}], partitions=5)
+    assert sorted(doc["_id"] for doc in documents) == sorted(doc["_id"] for doc in collection.find({"team": "A"}))
@@ -0,0 +1,208 @@
+"""
+Golden tests: formatters.format_tasks moet exact dezelfde output geven als FORMAT_TASKS.
+
+De verwachte documenten hieronder volgen de semantiek van de $project stage in
+pipelines/format_tasks.py (veldvolgorde, $$REMOVE voor ontbrekende velden,
+$switch defaults, $toString van doubles). Ze worden vergeleken als JSON, dus
+ook de volgorde van de velden telt.
+
+Met MONGODB_TEST_URI (bv. mongodb://localhost:27017) draait daarnaast een
+vergelijking tegen een echte server: seed.py documenten plus dezelfde randgevallen
+door JOIN_PROJECTS + FORMAT_TASKS tegenover format_tasks, en get_tasks met
+server- en client formatting in dezelfde volgorde.
+"""
+import json
+import os
+import random
+import uuid
+from datetime import datetime
+import pytest
+from bson import ObjectId
+from aggregations.formatters import RAW_TASK_PROJECTION, format_tasks
+from aggregations.get_tasks_aggregation import GetTasksAggregation
+from aggregations.pipelines import FORMAT_TASKS, JOIN_PROJECTS
+from benchmarks.seed import make_project, make_task, to_ticks
+
+PROJECT_ID = ObjectId("65a000000000000000000001")
+
+
+def _project(**overrides) -> dict:
+    project = {
+        "_id": PROJECT_ID,
+        "Name": "Dak herstelling",
+        "ProjectNumber": "PR/2024/0042",
+        "Status": 3,
+        "Type": 2,
+        "ExecutedPercentage": 50,
+        "Address": {"Addressline1": "Straat 12", "Zip": "9000", "City": "Gent"},
+        "CustomerReference": "KR-1234",
+        "RequestedExecutionDate": to_ticks(datetime(2024, 6, 3)),
+        "Measurements": [{}, {}],
+        "OpenQuotations": 1,
+        "Stats": {"EstimatedTurnover": 12500},
+        "Contacts": [
+            {"Tags": ["Architect"], "Contact": {"DisplayName": "Architect"}},
+            {"Tags": ["Klant"], "Contact": {"DisplayName": "Klant Janssens",
+                                            "Phone": "0470000000", "Email": "klant@example.com"}},
+        ],
+        "WebUrl": "https://example.sharepoint.com/sites/project",
+    }
+    project.update(overrides)
+    return project
+
+
+def _task(task_id: int, **overrides) -> dict:
+    task = {
+        "_id": ObjectId(f"65b0000000000000000000{task_id:02d}"),
+        "Title": "Lekkage dak",
+        "Description": "Water in de goot",
+        "Status": 1,
+        "Type": 2,
+        "DueDate": to_ticks(datetime(2024, 3, 15, 10, 30)),
+        "CreatedOn": to_ticks(datetime(2024, 1, 2, 8, 5)),
+        "UserId": "user-7",
+        "Team": "Planning",
+        "ProjectId": str(PROJECT_ID),
+        "Notes": [{"Message": "Klant gebeld", "Username": "Gebruiker", "UserId": "user-1",
+                   "Moment": to_ticks(datetime(2024, 1, 2, 9, 45))}],
+        "TaskList": [
+            {"Title": "Opmeten", "Completed": True, "Order": 0},
+            {"Title": "Offerte", "Completed": False, "Order": 1},
+        ],
+        "Version": "1.0.2",
+    }
+    task.update(overrides)
+    return task
+
+
+def _expected(task_id: int, project=None, **overrides) -> dict:
+    expected = {
+        "taskId": f"65b0000000000000000000{task_id:02d}",
+        "titel": "Lekkage dak",
+        "beschrijving": "Water in de goot",
+        "status": "Open",
+        "type": "Klacht",
+        "deadline": "15-03-2024",
+        "toegewezenAan": "user-7",
+        "team": "Planning",
+        "aangemaakt": "02-01-2024",
+        "project": {
+            "naam": "Dak herstelling",
+            "nummer": "PR/2024/0042",
+            "status": "Offerte verstuurd",
+            "type": "PRO",
+            "voortgang": "50%",
+            "locatie": "Straat 12, 9000 Gent",
+            "klantReferentie": "KR-1234",
+            "gewensteStartdatum": "03-06-2024",
+            **(project or {}),
+        },
+        "notes": [{"bericht": "Klant gebeld", "auteur": "Gebruiker", "auteurId": "user-1",
+                   "datum": "02-01-2024 09:45"}],
+        "aantalNotes": 1,
+        "subtaken": [
+            {"titel": "Opmeten", "voltooid": True, "volgorde": 0},
+            {"titel": "Offerte", "voltooid": False, "volgorde": 1},
+        ],
+        "aantalSubtaken": 2,
+        "voltooideSubtaken": 1,
+        "versie": "1.0.2",
+        "extra": {
+            "aantalOpmetingen": 2,
+            "openOffertes": 1,
+            "geschatteOmzet": 12500,
+            "hoofdcontact": {"naam": "Klant Janssens", "telefoon": "0470000000", "email": "klant@example.com"},
+            "sharepointLink": "https://example.sharepoint.com/sites/project",
+        },
+    }
+    expected.update(overrides)
+    return expected
+
+
+MISSING_PROJECT = {
+    "status": "Onbekend",
+    "voortgang": "0%",
+    "locatie": ",  ",
+    "gewensteStartdatum": None,
+}
+
+# (naam, ruwe taak, project of None, verwachte output)
+CASES = [
+    ("complete", _task(1), _project(), _expected(1)),
+    ("missing project", _task(2, ProjectId=""), None,
+     {**_expected(2), "project": MISSING_PROJECT, "extra": {"aantalOpmetingen": 0, "hoofdcontact": {}}}),
+    ("type outside map", _task(3, Type=42), _project(Type=9),
+     _expected(3, project={"type": 9}, type=42)),
+    ("double percentage", _task(4), _project(ExecutedPercentage=33.5),
+     _expected(4, project={"voortgang": "33.5%"})),
+    ("integral double percentage", _task(5), _project(ExecutedPercentage=75.0),
+     _expected(5, project={"voortgang": "75%"})),
+    ("no Klant contact", _task(6), _project(Contacts=[{"Tags": ["Architect"], "Contact": {"DisplayName": "Architect"}}]),
+     {**_expected(6), "extra": {**_expected(6)["extra"], "hoofdcontact": {}}}),
+]
+
+
+def _joined(task: dict, project) -> dict:
+    """Document zoals na JOIN_PROJECTS en de RAW_TASK_PROJECTION."""
+    doc = {key: value for key, value in task.items() if key != "ProjectId"}
+    if project is not None:
+        doc["ProjectDetails"] = {key: value for key, value in project.items() if key != "_id"}
+    return doc
+
+
+@pytest.mark.parametrize("name, task, project, expected", CASES, ids=[case[0] for case in CASES])
+def test_format_task_matches_format_tasks(name, task, project, expected):
+    [formatted] = format_tasks([_joined(task, project)])
+    assert json.dumps(formatted) == json.dumps(expected)
+
+
+def test_format_tasks_keeps_order():
+    docs = [_joined(task, project) for _, task, project, _ in CASES]
+    assert [doc["taskId"] for doc in format_tasks(docs)] == [expected["taskId"] for *_, expected in CASES]
+
+
+# === VERGELIJKING TEGEN EEN ECHTE SERVER ===
+
+@pytest.fixture
+def golden_db():
+    uri = os.environ.get("MONGODB_TEST_URI")
+    if not uri:
+        pytest.skip("MONGODB_TEST_URI not set")
+    from pymongo import MongoClient
+    client = MongoClient(uri)
+    db = client[f"format_tasks_golden_{uuid.uuid4().hex[:8]}"]
+
+    rng = random.Random(7)
+    projects = [make_project(rng) for _ in range(20)]
+    tasks = [make_task(rng, [p["_id"] for p in projects]) for _ in range(300)]
+    # Randgevallen delen PROJECT_ID: in de database krijgt elk geval een eigen project
+    for i, (_, task, project, _) in enumerate(CASES):
+        task = dict(task)
+        if project is not None:
+            project = dict(project, _id=ObjectId(f"65a0000000000000000001{i:02d}"))
+            task["ProjectId"] = str(project["_id"])
+            projects.append(project)
+        tasks.append(task)
+    db.Projects.insert_many(projects)
+    db.Tasks.insert_many(tasks)
+    yield db
+    client.drop_database(db.name)
+    client.close()
+
+
+def test_format_tasks_matches_server(golden_db):
+    ordered = [{"$sort": {"_id": 1}}, *JOIN_PROJECTS]
+    server = list(golden_db.Tasks.aggregate(ordered + FORMAT_TASKS))
+    client = format_tasks(list(golden_db.Tasks.aggregate(ordered + [{"$project": RAW_TASK_PROJECTION}])))
+    assert [json.dumps(doc) for doc in client] == [json.dumps(doc) for doc in server]
+
+
+@pytest.mark.parametrize("sort_by", ["created", "deadline"])
+def test_get_tasks_same_order_server_and_client(golden_db, sort_by):
+    class GoldenGetTasks(GetTasksAggregation):
+        database = golden_db.name
+
+    params = {"sort_by": sort_by, "limit": 50}
+    server = GoldenGetTasks().execute(golden_db.client, dict(params, formatting="server"))
+    client = GoldenGetTasks().execute(golden_db.client, dict(params, formatting="client"))
+    assert [json.dumps(doc) for doc in client] == [json.dumps(doc) for doc in server]